@@ -1,27 +1,47 @@
 import asyncio
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Depends, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Depends, WebSocket, WebSocketDisconnect, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from typing import Optional, List, AsyncGenerator
-import io
 from contextlib import asynccontextmanager
-from services.utils import extract_text_from_pdf_stream, pdf_to_base64
-from services.llm import call_llm_for_interview_prep, get_follow_up_question, process_interview_completion
-from services.tts_services import text_to_speech_sarvam_base64_array
+from services.intake_cache import intake_cache, content_hash, resume_text_key
+from services.listing import documents_response, LIST_MAX_PAGE_SIZE, LIST_FORMAT_PATTERN, FORMAT_JSON, NEXT_CURSOR_HEADER
+from services.pdf_executor import start_pdf_executor, shutdown_pdf_executor, extract_pdf_text, get_pdf_stats, PDFExtractionError, PDF_MAX_BYTES
+from services.llm import get_follow_up_question, stream_follow_up_question, process_interview_completion, FollowUpContext, get_follow_up_stats
+from services.speech_pipeline import stream_sentences, synthesize_sentences
+from services.interview_protocol import InterviewChannel, parse_protocol_version
+from services.tts_services import text_to_speech_sarvam_base64_array, start_tts_client, close_tts_client, get_tts_stats, find_question_audio
+from services.question_prefetch import QuestionPrefetch, get_prefetch_stats
 from services.model_schema import InterviewDataStorage, JDCreate, InterviewSummaryResponse
-from services.mongo_op import connect_to_mongo, close_mongo_connection, save_resume, save_interview_data, get_resume_by_jd, get_jd_by_id, get_interview_data_by_id, get_jd_by_domain, save_jd, update_interview_data
-from services.asr_services import transcribe_audio
-from services.camera import OpenCVAntiCheat
-import json
-import base64
-import cv2
-import numpy as np
+from services.mongo_op import connect_to_mongo, close_mongo_connection, save_resume, save_interview_data, find_resumes_by_jd, get_jd_by_id, get_interview_data_by_id, find_jds, save_jd, update_interview_data, get_proctoring_summary, complete_intake_job, get_intake_status, open_resume_file
+from services.resume_intake import start_intake_workers, stop_intake_workers, intake_has_capacity, enqueue_intake, wait_for_intake, get_intake_stats, cached_interview_questions, start_presynthesis, INTAKE_PENDING, INTAKE_FAILED, INTAKE_STATUSES, INTAKE_RETRY_AFTER, INTAKE_WAIT_TIMEOUT
+from services.asr_services import transcribe_audio, asr_backend
+from services.audio_stream import StreamingTranscriber, AUDIO_SEGMENT_MAX_BYTES, AUDIO_ANSWER_MAX_BYTES, AUDIO_STREAM_START, AUDIO_SEGMENT_END, AUDIO_STREAM_END
+from services.camera import OpenCVAntiCheat, process_frame_bytes, OUTPUT_FRAME, OUTPUT_METRICS
+from services.frame_executor import start_frame_executor, shutdown_frame_executor
+from services.frame_batcher import start_frame_scheduler, stop_frame_scheduler, submit_frame_job, frame_stats
+from services.frame_pacing import LatestFrameSlot, AdaptiveFrameRate, timed_job
+from services.proctoring_telemetry import telemetry, start_telemetry_flusher, stop_telemetry_flusher
+from bson import ObjectId
+from bson.errors import InvalidId
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    start_tts_client()
+    start_frame_executor()
+    start_pdf_executor()
+    start_frame_scheduler()
+    start_telemetry_flusher()
+    await start_intake_workers()
     yield
+    await stop_intake_workers()
+    await stop_frame_scheduler()
+    await stop_telemetry_flusher()
+    shutdown_frame_executor()
+    shutdown_pdf_executor()
+    await close_tts_client()
     await close_mongo_connection()
     print("Application shutdown: MongoDB connection closed.")
 
@@ -33,6 +53,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
@@ -56,78 +77,138 @@ async def upload_job_description(jd: JDCreate):
 
 
 @app.get("/jd/{domain}/", tags=["Job Descriptions"])
-async def fetch_jd_by_domain(domain: str):
+async def fetch_jd_by_domain(
+    domain: str,
+    include_text: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    output_format: str = Query(FORMAT_JSON, alias="format", pattern=LIST_FORMAT_PATTERN),
+):
     """
     Fetch job descriptions by domain. Use 'all' to get all job descriptions.
+    jd_text is included with include_text=true. Streamed as a JSON array (or NDJSON with format=ndjson);
+    with limit the response is one page and X-Next-Cursor holds the after= value of the next one.
     """
     try:
         domain = domain.replace("/", "-")
-        jd_list = await get_jd_by_domain(domain)
-        if not jd_list:
-            return JSONResponse(status_code=404, content={"message": f"No job descriptions found for domain: {domain}"})
-        return jd_list
+        cursor = find_jds(domain, include_text, limit, after)
+        return await documents_response(cursor, limit, output_format, not_found=None if after else f"No job descriptions found for domain: {domain}")
+    except InvalidId:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {after}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching job descriptions: {str(e)}")
 
 
 @app.get("/resumes/{jd_id}/", tags=["Resumes"])
-async def fetch_resume(jd_id: str):
+async def fetch_resume(
+    jd_id: str,
+    include_text: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    output_format: str = Query(FORMAT_JSON, alias="format", pattern=LIST_FORMAT_PATTERN),
+):
     """
-    Fetches a stored resume (Base64 string) by candidate_name.
+    Metadata of the resumes submitted for a JD, the PDF itself is served by /resumes/{resume_id}/file.
+    Extracted text with include_text=true, pagination and formats as for /jd/{domain}/.
     """
     try:
-        resume_data = await get_resume_by_jd(jd_id)
-        return resume_data
+        cursor = find_resumes_by_jd(jd_id, include_text, limit, after)
+        return await documents_response(cursor, limit, output_format)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {after}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching resume: {e}")
 
 
-@app.post("/resumes/apply/", tags=["Resumes"])
+async def stream_resume_chunks(stream):
+    # GridFS chunks are sent as stored, the file is never assembled in memory
+    while True:
+        chunk = await stream.readchunk()
+        if not chunk:
+            break
+        yield chunk
+
+
+@app.get("/resumes/{resume_id}/file", tags=["Resumes"])
+async def download_resume(resume_id: str):
+    """
+    Download a stored resume PDF.
+    """
+    try:
+        resume_file = await open_resume_file(resume_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid resume ID: {e}")
+
+    if not resume_file:
+        raise HTTPException(status_code=404, detail=f"Resume {resume_id} not found")
+
+    headers = {
+        "Content-Disposition": f'inline; filename="{resume_file["filename"]}"',
+        "Content-Length": str(resume_file["length"]),
+    }
+    if "data" in resume_file:
+        return Response(content=resume_file["data"], media_type="application/pdf", headers=headers)
+    return StreamingResponse(stream_resume_chunks(resume_file["stream"]), media_type="application/pdf", headers=headers)
+
+
+@app.post("/resumes/apply/", status_code=202, tags=["Resumes"])
 async def analyze_resume(candidate_name: str = Form(...), candidate_email: str = Form(...), resume_file: UploadFile = File(...), jd_id: str = Form(...)):
+    """
+    Store the application and queue interview question generation.
+    Returns the interview id right away, poll /interview/{interview_id}/status until it is interview_scheduled.
+    """
     if not resume_file.filename or not resume_file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Invalid file type or missing filename. Only PDF is allowed.")
 
+    if not intake_has_capacity():
+        raise HTTPException(status_code=503, detail="Too many applications are being processed, please retry shortly.", headers={"Retry-After": str(INTAKE_RETRY_AFTER)})
+
     jd_text = await get_jd_by_id(jd_id)
 
     if not jd_text:
         raise HTTPException(status_code=404, detail="Job description not found.")
 
-    resume_text = ""
-    resume_base64_str = ""
-
     try:
         # Read resume file contents
         resume_content = await resume_file.read()
-        resume_bytes_io = io.BytesIO(resume_content)
-
-        resume_text = extract_text_from_pdf_stream(resume_bytes_io)
-        resume_base64_str = pdf_to_base64(resume_bytes_io)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing resume file: {e}")
     finally:
         await resume_file.close()
 
+    if len(resume_content) > PDF_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Resume file is larger than {PDF_MAX_BYTES // (1024 * 1024)} MB.")
+
+    # Re-applications with the same PDF reuse the text extracted the first time
+    resume_sha256 = content_hash(resume_content)
+    text_cache_key = resume_text_key(resume_sha256)
+    resume_text = await intake_cache.get(text_cache_key)
+    if resume_text is None:
+        try:
+            # Parsed in a worker process, with page and time limits
+            resume_text = await extract_pdf_text(resume_content)
+        except PDFExtractionError as e:
+            raise HTTPException(status_code=422, detail=f"Error processing resume file: {e}")
+        if resume_text.strip():
+            await intake_cache.put(text_cache_key, resume_text)
+
     if not resume_text.strip():
         print(f"Warning: No text extracted from resume: {resume_file.filename}")
         raise HTTPException(status_code=422, detail="Could not extract text from resume PDF.")
 
-    result = await save_resume(candidate_name, resume_base64_str, resume_text, jd_id)
+    result = await save_resume(candidate_name, resume_content, resume_text, jd_id, resume_sha256)
 
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
 
-    try:
-        llm_result = await call_llm_for_interview_prep(resume_text, jd_text)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred during LLM processing: {e}")
+    # Same resume for the same JD: questions are ready without queueing an LLM call
+    cached_questions = await cached_interview_questions(resume_text, jd_text)
 
     interview_data_to_store_dict = {
         "candidate_name": candidate_name,
         "candidate_email": candidate_email,
         "resume_text": resume_text,
         "jd_id": jd_id,
-        "interview_questions": llm_result.get('interview_questions'),
-        "status": "interview_scheduled"
+        "interview_questions": cached_questions or [],
+        "status": "interview_scheduled" if cached_questions else INTAKE_PENDING
     }
 
     interview_data_to_store = InterviewDataStorage(**interview_data_to_store_dict)
@@ -136,7 +217,111 @@ async def analyze_resume(candidate_name: str = Form(...), candidate_email: str =
     if 'error' in save_res:
         raise HTTPException(status_code=500, detail=save_res['error'])
 
-    return {'message': "Interview preparation data processed and stored successfully.", 'interview_id': save_res['id']}
+    if cached_questions:
+        start_presynthesis(save_res['id'], cached_questions)
+        return {'message': "Interview preparation data processed and stored successfully.", 'interview_id': save_res['id'], 'status': "interview_scheduled"}
+
+    # Questions are generated by the intake workers
+    if not enqueue_intake(save_res['id']):
+        await complete_intake_job(save_res['id'], [], INTAKE_FAILED, "Intake queue was full.")
+        raise HTTPException(status_code=503, detail="Too many applications are being processed, please retry shortly.", headers={"Retry-After": str(INTAKE_RETRY_AFTER)})
+
+    return {'message': "Application received, interview questions are being prepared.", 'interview_id': save_res['id'], 'status': INTAKE_PENDING}
+
+
+async def receive_ws_message(websocket: WebSocket):
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    return message
+
+
+async def receive_streamed_answer(websocket: WebSocket, interview_id: str) -> Optional[str]:
+    stream = StreamingTranscriber(transcribe_audio)
+    try:
+        while True:
+            message = await receive_ws_message(websocket)
+            if message.get("bytes") is not None:
+                if not stream.add_chunk(message["bytes"]):
+                    if stream.answer_overflowed:
+                        await websocket.send_text(f"ERROR:Answer too long. Please keep each answer under {AUDIO_ANSWER_MAX_BYTES // (1024 * 1024)}MB of audio.")
+                    else:
+                        await websocket.send_text(f"ERROR:Audio segment too large. Please keep each segment under {AUDIO_SEGMENT_MAX_BYTES // (1024 * 1024)}MB.")
+            elif message.get("text") == AUDIO_SEGMENT_END:
+                stream.end_segment()
+            elif message.get("text") == AUDIO_STREAM_END:
+                print(f"Received streamed audio response from candidate for interview {interview_id}, size: {stream.total_bytes} bytes in {len(stream.tasks) + 1} segments")
+                return await stream.finish()
+    finally:
+        stream.cancel()
+
+
+async def receive_candidate_answer(websocket: WebSocket, interview_id: str) -> Optional[str]:
+    """
+    Wait for the candidate's next answer and return its transcription, or None if transcription failed.
+    Clients either send the whole answer as one binary message, or stream it: AUDIO_STREAM_START,
+    binary chunks with AUDIO_SEGMENT_END between self-contained segments, then AUDIO_STREAM_END.
+    """
+    while True:
+        message = await receive_ws_message(websocket)
+
+        if message.get("text") == AUDIO_STREAM_START:
+            return await receive_streamed_answer(websocket, interview_id)
+
+        candidate_response_audio = message.get("bytes")
+        if candidate_response_audio is None:
+            continue
+
+        print(f"Received audio response from candidate for interview {interview_id}, size: {len(candidate_response_audio)} bytes")
+
+        if len(candidate_response_audio) > AUDIO_SEGMENT_MAX_BYTES:
+            await websocket.send_text(f"ERROR:Audio file too large. Please keep recordings under {AUDIO_SEGMENT_MAX_BYTES // (1024 * 1024)}MB.")
+            continue
+
+        try:
+            return await transcribe_audio(candidate_response_audio)
+        except Exception:
+            # Timed out or failed after retries, let the candidate answer again
+            return None
+
+
+async def stream_follow_up_turn(channel: InterviewChannel, message_history: list, interview_data: dict, context: FollowUpContext) -> str:
+    """
+    Stream the follow-up question sentence by sentence: each sentence goes to TTS as soon as the LLM
+    finishes it and is sent as AI_QUESTION_PART + AI_AUDIO_PART, followed by AI_QUESTION_END with the full text.
+    Returns the full text, or '[END]' when the interview is over, preceded by the text already sent if
+    [END] only came after some sentences.
+    """
+    sentences = []
+    ended = False
+
+    async def question_sentences():
+        nonlocal ended
+        # The first sentence is held back until the next one shows it was not a sign-off before [END]
+        held = None
+        async for sentence in stream_sentences(stream_follow_up_question(message_history, interview_data, context)):
+            if '[END]' in sentence:
+                ended = True
+                return
+            if held is None and not sentences:
+                held = sentence
+                continue
+            for ready in filter(None, (held, sentence)):
+                sentences.append(ready)
+                yield ready
+            held = None
+        if held:
+            sentences.append(held)
+            yield held
+
+    await synthesize_sentences(question_sentences(), channel.send_question_part)
+
+    if not sentences:
+        return '[END]'
+
+    next_question_text = " ".join(sentences)
+    await channel.send_question_end(next_question_text)
+    return f"{next_question_text} [END]" if ended else next_question_text
 
 
 @app.websocket("/ws/interview/{interview_id}/")
@@ -149,56 +334,69 @@ async def websocket_interview_endpoint(websocket: WebSocket, interview_id: str):
         await websocket.close(code=1008)
         return
 
+    if interview_data.get("status") in INTAKE_STATUSES:
+        # Connected right after applying, wait for the questions to be generated
+        await websocket.send_text("STATUS:preparing_questions")
+        interview_data = await wait_for_intake(interview_id, INTAKE_WAIT_TIMEOUT)
+        if not interview_data or interview_data.get("status") == INTAKE_FAILED:
+            await websocket.send_text("ERROR:Interview questions could not be prepared. Please try again later.")
+            await websocket.close(code=1011)
+            return
+
     total_questions = len(interview_data.get("interview_questions", []))
+    # stream=1: follow-up questions are streamed sentence by sentence (AI_QUESTION_PART / AI_AUDIO_PART / AI_QUESTION_END)
+    stream_questions = websocket.query_params.get("stream") in ("1", "true")
+    # protocol=2: question audio as binary frames instead of base64 JSON text
+    channel = InterviewChannel(websocket, parse_protocol_version(websocket.query_params.get("protocol")))
 
     message_history = []
+    # Stable system prompt and rolling summary of older turns, shared by every follow-up of this interview
+    follow_up_context = FollowUpContext(interview_data)
+    closing_text = f"Thank you for all your thoughtful responses. That concludes our interview today. We'll be in touch regarding next steps.\nInterview ID: {interview_id} use this ID to check your interview status."
+    # Audio of the likely next question, prepared while the candidate answers
+    prefetch = QuestionPrefetch(interview_data, closing_text)
 
     try:
+        await channel.send_hello()
+
         if total_questions > 0:
             current_question = interview_data["interview_questions"][0]
 
             message_history.append({"role": "assistant", "content": current_question})
 
-            initial_audio_array = await text_to_speech_sarvam_base64_array(current_question)
-            await websocket.send_text(f"AI_QUESTION_TEXT:{current_question}")
-
-            audio_message = {"type": "audio_array", "audios": initial_audio_array}
-            await websocket.send_text(f"AI_AUDIO_ARRAY:{json.dumps(audio_message)}")
+            initial_audio_array = await find_question_audio(interview_data, current_question) or await text_to_speech_sarvam_base64_array(current_question)
+            await channel.send_question(current_question, initial_audio_array)
+            prefetch.start(message_history, closing_only=stream_questions)
         else:
             await websocket.send_text("ERROR:No interview questions found")
             await websocket.close(code=1008)
             return
 
         while True:
-            candidate_response_audio = await websocket.receive_bytes()
-            print(f"Received audio response from candidate for interview {interview_id}, size: {len(candidate_response_audio)} bytes")
-
-            audio_size_mb = len(candidate_response_audio) / (1024 * 1024)
-            if audio_size_mb > 25:  # Adjust based on your tier
-                await websocket.send_text("ERROR:Audio file too large. Please keep recordings under 25MB.")
-                continue
-
-            candidate_response_text = await transcribe_audio(candidate_response_audio)
+            candidate_response_text = await receive_candidate_answer(websocket, interview_id)
 
             if not candidate_response_text:
                 await websocket.send_text("ERROR:Failed to transcribe audio. Please try speaking again.")
                 continue
 
-            print(f"\n\nTranscribed (via Groq for {interview_id}): {candidate_response_text}\n\n")
+            print(f"\n\nTranscribed (via {asr_backend.name} for {interview_id}): {candidate_response_text}\n\n")
 
             message_history.append({"role": "user", "content": candidate_response_text})
 
-            next_question_text = await get_follow_up_question(message_history, interview_data)
-            if '[END]' in next_question_text:
-                closing_text = f"Thank you for all your thoughtful responses. That concludes our interview today. We'll be in touch regarding next steps.\nInterview ID: {interview_id} use this ID to check your interview status."
+            if stream_questions:
+                next_question_text = await stream_follow_up_turn(channel, message_history, interview_data, follow_up_context)
+            else:
+                next_question_text = await get_follow_up_question(message_history, interview_data, follow_up_context)
 
+            if '[END]' in next_question_text:
+                spoken_text = next_question_text.replace('[END]', '').strip()
+                if stream_questions and spoken_text:
+                    # Sentences streamed before [END] were heard by the candidate, keep them in the transcript
+                    message_history.append({"role": "assistant", "content": spoken_text})
                 message_history.append({"role": "assistant", "content": closing_text})
 
-                closing_audio_array = await text_to_speech_sarvam_base64_array(closing_text)
-                await websocket.send_text(f"AI_QUESTION_TEXT:{closing_text}")
-
-                audio_message = {"type": "audio_array", "audios": closing_audio_array}
-                await websocket.send_text(f"AI_AUDIO_ARRAY:{json.dumps(audio_message)}")
+                closing_audio_array = await prefetch.take(closing_text) or await text_to_speech_sarvam_base64_array(closing_text)
+                await channel.send_question(closing_text, closing_audio_array)
 
                 await process_interview_completion(interview_data, message_history)
                 await asyncio.sleep(1)
@@ -209,14 +407,21 @@ async def websocket_interview_endpoint(websocket: WebSocket, interview_id: str):
 
             else:
                 message_history.append({"role": "assistant", "content": next_question_text})
+                # Summarize older turns while the candidate answers, if the history is over budget
+                follow_up_context.schedule_compaction(message_history)
 
                 print(f"Next question for {interview_id}: {next_question_text}")
 
-                question_audio_array = await text_to_speech_sarvam_base64_array(next_question_text)
-                await websocket.send_text(f"AI_QUESTION_TEXT:{next_question_text}")
+                if not stream_questions:
+                    question_audio_array = (
+                        await prefetch.take(next_question_text)
+                        or await find_question_audio(interview_data, next_question_text)
+                        or await text_to_speech_sarvam_base64_array(next_question_text)
+                    )
+                    await channel.send_question(next_question_text, question_audio_array)
+                # Streamed questions were already sent sentence by sentence
 
-                audio_message = {"type": "audio_array", "audios": question_audio_array}
-                await websocket.send_text(f"AI_AUDIO_ARRAY:{json.dumps(audio_message)}")
+                prefetch.start(message_history, closing_only=stream_questions)
 
     except WebSocketDisconnect:
         print(f"Client disconnected from interview {interview_id}")
@@ -237,6 +442,9 @@ async def websocket_interview_endpoint(websocket: WebSocket, interview_id: str):
         except RuntimeError:
             pass
 
+    finally:
+        prefetch.cancel()
+
 
 @app.get("/interview/{interview_id}", response_model=InterviewSummaryResponse, tags=["Interviews"])
 async def get_interview_summary(interview_id: str):
@@ -271,6 +479,139 @@ async def get_interview_summary(interview_id: str):
         raise HTTPException(status_code=500, detail=f"Error retrieving interview data: {str(e)}")
 
 
+@app.get("/interview/{interview_id}/status", tags=["Interviews"])
+async def get_interview_status(interview_id: str):
+    """
+    Lightweight status poll for an application: intake_pending, intake_processing, intake_failed, interview_scheduled, ...
+    """
+    try:
+        interview_data = await get_intake_status(interview_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid interview ID: {e}")
+
+    if not interview_data:
+        raise HTTPException(status_code=404, detail=f"Interview with ID {interview_id} not found")
+
+    status = interview_data.get("status")
+    response = {"interview_id": interview_id, "status": status}
+    if status in INTAKE_STATUSES:
+        response["retry_after"] = INTAKE_RETRY_AFTER
+    if status == INTAKE_FAILED:
+        response["error"] = interview_data.get("intake_error")
+    return response
+
+
+@app.get("/interview/{interview_id}/proctoring", tags=["Interviews"])
+async def get_interview_proctoring(interview_id: str):
+    """
+    Proctoring summary for an interview, summed from its time-bucketed telemetry.
+    """
+    try:
+        summary = await get_proctoring_summary(interview_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving proctoring data: {str(e)}")
+
+    if not summary:
+        raise HTTPException(status_code=404, detail=f"No proctoring data found for interview {interview_id}")
+    return summary
+
+
+@app.get("/stats/camera", tags=["Stats"])
+async def get_camera_stats():
+    """
+    Frame analysis throughput and queue depth.
+    """
+    return frame_stats()
+
+
+@app.get("/stats/intake", tags=["Stats"])
+async def get_resume_intake_stats():
+    """
+    Resume intake queue depth, outcomes and time from upload to questions ready, PDF extraction throughput.
+    """
+    return {**get_intake_stats(), "pdf": get_pdf_stats()}
+
+
+@app.get("/stats/tts", tags=["Stats"])
+async def get_text_to_speech_stats():
+    """
+    Text-to-speech call counts and latency histograms.
+    """
+    return get_tts_stats()
+
+
+@app.get("/stats/llm", tags=["Stats"])
+async def get_llm_stats():
+    """
+    Follow-up question prompt sizes and latency, LLM gateway load per priority class.
+    """
+    return get_follow_up_stats()
+
+
+@app.get("/stats/prefetch", tags=["Stats"])
+async def get_question_prefetch_stats():
+    """
+    Speculative next-question audio: hit rate and synthesis latency saved.
+    """
+    return get_prefetch_stats()
+
+
+async def send_frame_result(websocket: WebSocket, detector: OpenCVAntiCheat, interview_id: Optional[str], result):
+    if result is None:
+        print("Failed to decode image")
+        return
+
+    if interview_id:
+        telemetry.record(interview_id, detector.session)
+
+    response_text, overlay_bytes = result
+    await websocket.send_text(response_text)
+    if overlay_bytes is not None:
+        await websocket.send_bytes(overlay_bytes)
+
+
+async def receive_latest_frames(websocket: WebSocket, slot: LatestFrameSlot):
+    """Keep reading frames into the slot so stale ones get replaced instead of queueing up."""
+    try:
+        while True:
+            slot.put(await websocket.receive_bytes())
+    finally:
+        slot.close()
+
+
+async def process_latest_frames(websocket: WebSocket, detector: OpenCVAntiCheat, interview_id: Optional[str], output: str, overlay: bool):
+    slot = LatestFrameSlot()
+    pacer = AdaptiveFrameRate()
+    receiver = asyncio.create_task(receive_latest_frames(websocket, slot))
+
+    try:
+        while True:
+            await pacer.wait()
+            image_data = await slot.get()
+            if image_data is None:
+                break
+
+            try:
+                pacing_metrics = {
+                    'frames_analyzed': pacer.analyzed + 1,
+                    'frames_dropped': slot.dropped,
+                    'analysis_fps': round(pacer.target_fps, 2)
+                }
+                result, cost = await submit_frame_job(timed_job, process_frame_bytes, detector, image_data, pacing_metrics, output, overlay)
+                pacer.record(cost)
+
+                await send_frame_result(websocket, detector, interview_id, result)
+
+            except Exception as e:
+                print(f"Error processing frame: {e}")
+                continue
+    finally:
+        receiver.cancel()
+
+    # Surface the disconnect (or error) that stopped the receiver
+    await receiver
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -278,48 +619,37 @@ async def websocket_endpoint(websocket: WebSocket):
     
     detector = OpenCVAntiCheat()
 
+    # frames=latest: analyze only the newest frame at an adaptive rate, dropping stale ones
+    frame_mode = websocket.query_params.get("frames", "all")
+    # output=metrics: reply with metrics only, overlay=1 adds a binary JPEG frame with the overlays
+    output = OUTPUT_METRICS if websocket.query_params.get("output") == OUTPUT_METRICS else OUTPUT_FRAME
+    overlay = websocket.query_params.get("overlay") in ("1", "true")
+    # interview_id links the proctoring telemetry to the interview report
+    interview_id = websocket.query_params.get("interview_id")
+    if interview_id and not ObjectId.is_valid(interview_id):
+        # Used as a telemetry key, so nothing is recorded for ids that can not belong to an interview
+        print(f"Ignoring invalid interview ID for camera telemetry: {interview_id}")
+        interview_id = None
+
     try:
+        if frame_mode == "latest":
+            await process_latest_frames(websocket, detector, interview_id, output, overlay)
+            return
+
         while True:
             # Receive image data from frontend
             image_data = await websocket.receive_bytes()
-            
-            # Decode the image from bytes to OpenCV format
-            # Assuming the frontend sends base64-encoded image
+
             try:
-                # If receiving base64 string
-                if isinstance(image_data, str):
-                    image_bytes = base64.b64decode(image_data)
-                else:
-                    # If receiving raw bytes
-                    image_bytes = image_data
-                
-                # Convert bytes to numpy array
-                nparr = np.frombuffer(image_bytes, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if frame is None:
-                    print("Failed to decode image")
-                    continue
-                
-                # Process the frame
-                processed_frame, metrics = detector.process_frame(frame)
-                
-                # Encode the processed frame back to base64
-                _, buffer = cv2.imencode('.jpg', processed_frame)
-                processed_frame_b64 = base64.b64encode(buffer).decode('utf-8')
-                
-                # Send response
-                response_data = {
-                    'frame': processed_frame_b64,
-                    'metrics': metrics
-                }
-                await websocket.send_text(json.dumps(response_data))
-                
+                # Decode, analyze and encode off the event loop (batched with other sessions when enabled)
+                result = await submit_frame_job(process_frame_bytes, detector, image_data, None, output, overlay)
+                await send_frame_result(websocket, detector, interview_id, result)
+
             except Exception as e:
                 print(f"Error processing frame: {e}")
                 continue
-            
+
     except WebSocketDisconnect:
         print("Client disconnected from camera processing")
     except Exception as e:
-        print(f"WebSocket error: {e}")
\ No newline at end of file
+        print(f"WebSocket error: {e}")
@@ -1,17 +1,50 @@
-from groq import Groq
+from groq import AsyncGroq
 from dotenv import load_dotenv
+import asyncio
+import itertools
+import json
 import os
+import tempfile
 
 load_dotenv()
-groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
 
+# groq (default), local (faster-whisper on CPU) or replay (fixture transcripts, no network)
+ASR_BACKEND = os.getenv("ASR_BACKEND", "groq")
 
-async def transcribe_audio(audio_data):
-    """
-    Speech recognition using Groq API.
-    """
-    try:
-        transcription = groq_client.audio.transcriptions.create(
+# Bound concurrent Whisper calls per worker, how long one attempt may take and the deadline for an answer including retries
+ASR_MAX_CONCURRENCY = int(os.getenv("ASR_MAX_CONCURRENCY", "8"))
+ASR_REQUEST_TIMEOUT = float(os.getenv("ASR_REQUEST_TIMEOUT", "20"))
+ASR_TIMEOUT = float(os.getenv("ASR_TIMEOUT", "45"))
+ASR_MAX_RETRIES = int(os.getenv("ASR_MAX_RETRIES", "2"))
+
+ASR_LOCAL_MODEL = os.getenv("ASR_LOCAL_MODEL", "tiny.en")
+ASR_REPLAY_FIXTURES = os.getenv("ASR_REPLAY_FIXTURES")
+ASR_REPLAY_LATENCY_MS = float(os.getenv("ASR_REPLAY_LATENCY_MS", "800"))
+
+DEFAULT_REPLAY_TRANSCRIPTS = [
+    "Hi, I'm a backend engineer with four years of experience building Python services and data pipelines.",
+    "In my last project I designed a FastAPI service backed by MongoDB that handled around two thousand requests per second.",
+    "I profiled the slow endpoints, added caching and moved the heavy work into background workers, which cut latency by half.",
+    "I usually start by writing down the requirements, then agree on the interfaces with the team before building anything.",
+]
+
+
+class ASRBackend:
+    name = "base"
+
+    async def transcribe(self, audio_data) -> str:
+        raise NotImplementedError
+
+
+class GroqASRBackend(ASRBackend):
+    name = "groq"
+
+    def __init__(self):
+        # The SDK retries connection errors, 408/409/429 and 5xx with exponential backoff
+        self.client = AsyncGroq(api_key=os.getenv('GROQ_API_KEY'), timeout=ASR_REQUEST_TIMEOUT, max_retries=ASR_MAX_RETRIES)
+
+    async def transcribe(self, audio_data) -> str:
+        transcription = await self.client.audio.transcriptions.create(
             file=("audio.webm", audio_data),
             model="whisper-large-v3",
             response_format="json",
@@ -19,6 +52,67 @@ async def transcribe_audio(audio_data):
             temperature=0.2
         )
         return transcription.text
+
+
+class LocalWhisperASRBackend(ASRBackend):
+    """On-device Whisper on the CPU, needs the optional faster-whisper package"""
+    name = "local"
+
+    def __init__(self, model_size=ASR_LOCAL_MODEL):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("ASR_BACKEND=local needs faster-whisper: pip install faster-whisper")
+        self.model = WhisperModel(model_size, device="cpu", compute_type="int8")
+
+    def _transcribe_sync(self, audio_data):
+        with tempfile.NamedTemporaryFile(suffix=".webm") as f:
+            f.write(audio_data)
+            f.flush()
+            segments, _ = self.model.transcribe(f.name, language="en", temperature=0.2)
+            return " ".join(segment.text.strip() for segment in segments)
+
+    async def transcribe(self, audio_data) -> str:
+        return await asyncio.to_thread(self._transcribe_sync, audio_data)
+
+
+class ReplayASRBackend(ASRBackend):
+    """Deterministic stand-in for load tests: replays fixture transcripts in order after a fixed delay"""
+    name = "replay"
+
+    def __init__(self, fixtures_path=ASR_REPLAY_FIXTURES, latency_ms=ASR_REPLAY_LATENCY_MS):
+        transcripts = DEFAULT_REPLAY_TRANSCRIPTS
+        if fixtures_path:
+            with open(fixtures_path) as f:
+                transcripts = json.load(f)
+        self.transcripts = itertools.cycle(transcripts)
+        self.latency = latency_ms / 1000
+
+    async def transcribe(self, audio_data) -> str:
+        await asyncio.sleep(self.latency)
+        return next(self.transcripts)
+
+
+ASR_BACKENDS = {
+    GroqASRBackend.name: GroqASRBackend,
+    LocalWhisperASRBackend.name: LocalWhisperASRBackend,
+    ReplayASRBackend.name: ReplayASRBackend,
+}
+
+if ASR_BACKEND not in ASR_BACKENDS:
+    raise ValueError(f"Unknown ASR_BACKEND {ASR_BACKEND!r}, expected one of {list(ASR_BACKENDS)}")
+
+asr_backend = ASR_BACKENDS[ASR_BACKEND]()
+asr_slots = asyncio.Semaphore(ASR_MAX_CONCURRENCY)
+
+
+async def transcribe_audio(audio_data):
+    """
+    Speech recognition using the configured ASR backend (Groq API by default).
+    """
+    try:
+        async with asr_slots:
+            return await asyncio.wait_for(asr_backend.transcribe(audio_data), timeout=ASR_TIMEOUT)
     except Exception as e:
         print(f"Error transcribing audio: {str(e)}")
-        raise e
\ No newline at end of file
+        raise e
@@ -0,0 +1,82 @@
+import asyncio
+import os
+
+# Whisper rejects uploads above 25MB, so no buffered segment may grow past this
+AUDIO_SEGMENT_MAX_BYTES = int(os.getenv("AUDIO_SEGMENT_MAX_BYTES", str(25 * 1024 * 1024)))
+# Audio of one whole streamed answer, segments waiting on ASR hold their bytes until transcribed
+AUDIO_ANSWER_MAX_BYTES = int(os.getenv("AUDIO_ANSWER_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Streaming answer protocol on /ws/interview/{id}/ (text control messages, audio as binary messages)
+AUDIO_STREAM_START = "AUDIO_STREAM_START"
+AUDIO_SEGMENT_END = "AUDIO_SEGMENT_END"
+AUDIO_STREAM_END = "AUDIO_STREAM_END"
+
+
+class StreamingTranscriber:
+    """
+    Buffers one streamed answer. Every finished segment (a self-contained recording the client
+    cut at a pause) is transcribed in the background while the candidate keeps speaking, so at
+    the end of the answer only the last segment is still waiting on ASR.
+    """
+
+    def __init__(self, transcribe, max_segment_bytes=AUDIO_SEGMENT_MAX_BYTES, max_answer_bytes=AUDIO_ANSWER_MAX_BYTES):
+        self.transcribe = transcribe
+        self.max_segment_bytes = max_segment_bytes
+        self.max_answer_bytes = max_answer_bytes
+        self.segment = bytearray()
+        # Sticky: once a segment was dropped or the answer got too long, the answer can only be incomplete
+        self.segment_dropped = False
+        self.answer_overflowed = False
+        self.tasks = []
+        self.total_bytes = 0
+
+    def add_chunk(self, chunk):
+        """
+        Append audio to the current segment. Returns False when the segment or the whole answer went over
+        its size limit, answer_overflowed tells which. Either way the answer has to be given again.
+        """
+        if self.failed:
+            return True
+        if self.total_bytes + len(chunk) > self.max_answer_bytes:
+            self.answer_overflowed = True
+            self.drop()
+            return False
+        if len(self.segment) + len(chunk) > self.max_segment_bytes:
+            self.segment_dropped = True
+            self.drop()
+            return False
+        self.segment += chunk
+        self.total_bytes += len(chunk)
+        return True
+
+    @property
+    def failed(self):
+        return self.segment_dropped or self.answer_overflowed
+
+    def drop(self):
+        """The answer can not be used any more, free what is buffered and ignore the rest of it"""
+        self.cancel()
+        self.segment = bytearray()
+
+    def end_segment(self):
+        if self.segment and not self.failed:
+            self.tasks.append(asyncio.create_task(self.transcribe(bytes(self.segment))))
+        self.segment = bytearray()
+
+    async def finish(self):
+        """
+        Transcribe the tail and return the whole answer. None if the answer was too long or any segment
+        was dropped or failed, a transcript with a gap in it would be taken for the complete answer.
+        """
+        if self.failed:
+            return None
+        self.end_segment()
+        results = await asyncio.gather(*self.tasks, return_exceptions=True)
+        if any(isinstance(r, BaseException) for r in results):
+            return None
+        texts = [r.strip() for r in results if isinstance(r, str) and r.strip()]
+        return " ".join(texts) or None
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
@@ -1,13 +1,63 @@
 import cv2
+import os
 import time
+import threading
+import json
+import base64
 import numpy as np
 
+# Full-frame detection runs every FACE_DETECT_INTERVAL frames (and on every frame while the tracked face is lost
+# or several faces are present),
+# frames in between only search a region around the last face
+FACE_DETECT_INTERVAL = int(os.getenv("FACE_DETECT_INTERVAL", "5"))
+# Number of pyrDown levels applied before full-frame detection
+FACE_DETECT_PYRAMID_LEVELS = int(os.getenv("FACE_DETECT_PYRAMID_LEVELS", "1"))
+# Never downscale the detection image below this width
+MIN_DETECT_WIDTH = 320
+# Search region around the tracked face, as a fraction of its size on each side
+TRACK_ROI_MARGIN = 0.5
+# Faces in the search region are downscaled to about this width before detection
+TRACK_FACE_WIDTH = 60
+
+
+FACE_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+PROFILE_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_profileface.xml'
+
+# Cascade XML is read from disk once per process, classifiers are built once per thread
+# because a CascadeClassifier must not be used by two threads at the same time
+_cascade_xml = {}
+_thread_cascades = threading.local()
+
+
+def _load_cascade(path):
+    if path not in _cascade_xml:
+        with open(path) as f:
+            _cascade_xml[path] = f.read()
+
+    storage = cv2.FileStorage(_cascade_xml[path], cv2.FILE_STORAGE_READ | cv2.FILE_STORAGE_MEMORY)
+    classifier = cv2.CascadeClassifier()
+    classifier.read(storage.getFirstTopLevelNode())
+    storage.release()
+    return classifier
+
+
+def get_cascades():
+    """Return this thread's (frontal, profile) classifiers, loading and warming them up on first use"""
+    cascades = getattr(_thread_cascades, "cascades", None)
+    if cascades is None:
+        cascades = (_load_cascade(FACE_CASCADE_PATH), _load_cascade(PROFILE_CASCADE_PATH))
+        warmup_frame = np.zeros((240, 320), np.uint8)
+        for cascade in cascades:
+            cascade.detectMultiScale(warmup_frame, 1.3, 5)
+        _thread_cascades.cascades = cascades
+    return cascades
+
+
+class ProctorSession:
+    """Per-connection proctoring state, kept small since there is one per live candidate"""
+    __slots__ = ('violations', 'frame_violations', 'total_frames', 'start_time', 'prev_face_center', 'tracked_face', 'frames_since_detect')
 
-class OpenCVAntiCheat:
     def __init__(self):
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        self.profile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_profileface.xml')
-
         self.violations = {
             'no_face': 0,
             'multiple_faces': 0,
@@ -15,13 +65,45 @@ class OpenCVAntiCheat:
             'too_close': 0,
             'too_far': 0
         }
+        # Violation keys counted for the latest frame, picked up by the telemetry aggregator
+        self.frame_violations = []
 
         self.total_frames = 0
         self.start_time = time.time()
 
         # For movement detection
         self.prev_face_center = None
+
+        # For detect-then-track face detection
+        self.tracked_face = None
+        self.frames_since_detect = 0
+
+
+class OpenCVAntiCheat:
+    def __init__(self, detect_interval=FACE_DETECT_INTERVAL, pyramid_levels=FACE_DETECT_PYRAMID_LEVELS):
+        self.session = ProctorSession()
+
+        # Violation thresholds, tools/rescore_video.py tunes these offline
         self.movement_threshold = 50
+        self.max_horizontal_deviation = 0.2
+        self.max_vertical_deviation = 0.15
+        self.min_face_ratio = 0.02
+        self.max_face_ratio = 0.35
+
+        self.detect_interval = max(1, detect_interval)
+        self.pyramid_levels = pyramid_levels
+
+    @property
+    def face_cascade(self):
+        return get_cascades()[0]
+
+    @property
+    def profile_cascade(self):
+        return get_cascades()[1]
+
+    def add_violation(self, key):
+        self.session.violations[key] += 1
+        self.session.frame_violations.append(key)
 
     def analyze_face_position(self, face, frame_shape):
         """Analyze if person is looking straight or away"""
@@ -44,7 +126,7 @@ class OpenCVAntiCheat:
         v_dev_ratio = vertical_deviation / frame_shape[0]
 
         # Check if looking straight (face centered)
-        looking_straight = h_dev_ratio < 0.2 and v_dev_ratio < 0.15
+        looking_straight = h_dev_ratio < self.max_horizontal_deviation and v_dev_ratio < self.max_vertical_deviation
 
         return {
             'looking_straight': looking_straight,
@@ -63,41 +145,95 @@ class OpenCVAntiCheat:
         face_ratio = face_area / frame_area
 
         # Classification
-        if face_ratio < 0.02:
+        if face_ratio < self.min_face_ratio:
             return 'too_far', face_ratio
-        elif face_ratio > 0.35:
+        elif face_ratio > self.max_face_ratio:
             return 'too_close', face_ratio
         else:
             return 'good_distance', face_ratio
 
     def check_profile_face(self, gray_frame):
         """Check if person turned to profile (side view)"""
-        profiles = self.profile_cascade.detectMultiScale(gray_frame, 1.3, 5)
+        small, _ = self.downscale(gray_frame)
+        profiles = self.profile_cascade.detectMultiScale(small, 1.3, 5)
         return len(profiles) > 0
 
-    def process_frame(self, frame):
-        """Main processing function"""
-        self.total_frames += 1
+    def downscale(self, gray_frame):
+        """Move down the image pyramid for detection, returns the image and its scale factor"""
+        scale = 1
+        for _ in range(self.pyramid_levels):
+            if gray_frame.shape[1] // 2 < MIN_DETECT_WIDTH:
+                break
+            gray_frame = cv2.pyrDown(gray_frame)
+            scale *= 2
+        return gray_frame, scale
+
+    def search_tracked_face(self, gray_frame):
+        """Look for the face only in a region around where it was last seen"""
+        x, y, w, h = self.session.tracked_face
+        margin_x, margin_y = int(w * TRACK_ROI_MARGIN), int(h * TRACK_ROI_MARGIN)
+        x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+        x1, y1 = min(gray_frame.shape[1], x + w + margin_x), min(gray_frame.shape[0], y + h + margin_y)
+
+        roi = gray_frame[y0:y1, x0:x1]
+        scale = 1
+        while w // (scale * 2) >= TRACK_FACE_WIDTH:
+            roi = cv2.pyrDown(roi)
+            scale *= 2
+
+        min_size = (int(w * 0.6) // scale, int(h * 0.6) // scale)
+        faces = self.face_cascade.detectMultiScale(roi, 1.3, 5, minSize=min_size)
+        return [(fx * scale + x0, fy * scale + y0, fw * scale, fh * scale) for fx, fy, fw, fh in faces]
+
+    def detect_faces(self, gray_frame):
+        """Detect frontal faces, tracking the last face between periodic full-frame detections"""
+        if self.session.tracked_face is not None and self.session.frames_since_detect < self.detect_interval:
+            faces = self.search_tracked_face(gray_frame)
+            if len(faces) > 0:
+                self.session.frames_since_detect += 1
+                return faces
+
+        # Periodic refresh or track lost: full-frame detection on a downscaled pyramid level
+        small, scale = self.downscale(gray_frame)
+        faces = self.face_cascade.detectMultiScale(small, 1.3, 5)
+        # Tracking only follows the largest face, so keep detecting on the full frame while several are
+        # present, otherwise multiple_faces would only be counted once per interval
+        self.session.frames_since_detect = 1 if len(faces) == 1 else self.detect_interval
+        return [(fx * scale, fy * scale, fw * scale, fh * scale) for fx, fy, fw, fh in faces]
+
+    def locate_faces(self, gray_frame):
+        """Detect frontal faces, or check for a profile when there are none, and update the tracked face.
+        Returns (faces, profile_detected)"""
+        faces = self.detect_faces(gray_frame)
+        if len(faces) == 0:
+            self.session.tracked_face = None
+            return faces, self.check_profile_face(gray_frame)
+
+        largest_face = max(faces, key=lambda f: f[2] * f[3])
+        self.session.tracked_face = tuple(int(v) for v in largest_face)
+        return faces, False
+
+    def process_frame(self, frame, draw=True):
+        """Main processing function. draw=False skips the overlays when the frame is not sent back"""
+        self.session.total_frames += 1
+        self.session.frame_violations = []
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-        # Detect frontal faces
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+        # Detect frontal faces, profile faces when no frontal one is found
+        faces, profile_detected = self.locate_faces(gray)
 
         violations_this_frame = []
         metrics = {}
 
         if len(faces) == 0:
-            # Check for profile faces
-            profile_detected = self.check_profile_face(gray)
-
             if profile_detected:
                 violations_this_frame.append("Person turned to side profile")
-                self.violations['looking_away'] += 1
+                self.add_violation('looking_away')
                 metrics['face_detected'] = True
                 metrics['looking_straight'] = False
             else:
                 violations_this_frame.append("No face detected")
-                self.violations['no_face'] += 1
+                self.add_violation('no_face')
                 metrics['face_detected'] = False
                 metrics['looking_straight'] = False
 
@@ -106,7 +242,7 @@ class OpenCVAntiCheat:
         elif len(faces) > 1:
             # Multiple faces
             violations_this_frame.append("Multiple faces detected")
-            self.violations['multiple_faces'] += 1
+            self.add_violation('multiple_faces')
 
             # Use largest face
             largest_face = max(faces, key=lambda f: f[2] * f[3])
@@ -117,7 +253,8 @@ class OpenCVAntiCheat:
             x, y, w, h = face
 
             # Draw face rectangle
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            if draw:
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
             metrics['face_detected'] = True
 
@@ -128,7 +265,7 @@ class OpenCVAntiCheat:
 
             if not position_analysis['looking_straight']:
                 violations_this_frame.append("Not looking straight at camera")
-                self.violations['looking_away'] += 1
+                self.add_violation('looking_away')
 
             # Analyze face size (distance)
             distance_status, face_ratio = self.analyze_face_size(face, frame.shape)
@@ -136,26 +273,26 @@ class OpenCVAntiCheat:
 
             if distance_status == 'too_far':
                 violations_this_frame.append("Sitting too far from camera")
-                self.violations['too_far'] += 1
+                self.add_violation('too_far')
             elif distance_status == 'too_close':
                 violations_this_frame.append("Sitting too close to camera")
-                self.violations['too_close'] += 1
+                self.add_violation('too_close')
 
             # Track movement (excessive movement detection)
             current_center = position_analysis['face_center']
-            if self.prev_face_center is not None:
-                movement = np.sqrt((current_center[0] - self.prev_face_center[0]) ** 2 +
-                                   (current_center[1] - self.prev_face_center[1]) ** 2)
+            if self.session.prev_face_center is not None:
+                movement = np.sqrt((current_center[0] - self.session.prev_face_center[0]) ** 2 +
+                                   (current_center[1] - self.session.prev_face_center[1]) ** 2)
                 if movement > self.movement_threshold:
                     violations_this_frame.append("Excessive movement detected")
 
-            self.prev_face_center = current_center
+            self.session.prev_face_center = current_center
 
         # Calculate overall metrics
-        total_violations = sum(self.violations.values())
-        violation_rate = (total_violations / self.total_frames) * \
-            100 if self.total_frames > 0 else 0
-        session_duration = time.time() - self.start_time
+        total_violations = sum(self.session.violations.values())
+        violation_rate = (total_violations / self.session.total_frames) * \
+            100 if self.session.total_frames > 0 else 0
+        session_duration = time.time() - self.session.start_time
 
         # Compile final metrics - ensure all values are JSON serializable
         metrics.update({
@@ -163,12 +300,13 @@ class OpenCVAntiCheat:
             'violation_count': int(len(violations_this_frame)),
             'total_violation_rate': float(round(violation_rate, 2)),
             'session_duration': float(round(session_duration, 1)),
-            'total_frames': int(self.total_frames),
-            'violations_breakdown': {k: int(v) for k, v in self.violations.items()}
+            'total_frames': int(self.session.total_frames),
+            'violations_breakdown': {k: int(v) for k, v in self.session.violations.items()}
         })
 
         # Add visual indicators to frame
-        self.add_visual_feedback(frame, violations_this_frame, metrics)
+        if draw:
+            self.add_visual_feedback(frame, violations_this_frame, metrics)
 
         return frame, metrics
 
@@ -187,9 +325,61 @@ class OpenCVAntiCheat:
     #         y_offset += 20
 
     #     # Session stats at bottom
-    #     stats_text = f"Violations: {sum(self.violations.values())} | Rate: {metrics['total_violation_rate']:.1f}%"
+    #     stats_text = f"Violations: {sum(self.session.violations.values())} | Rate: {metrics['total_violation_rate']:.1f}%"
     #     cv2.putText(frame, stats_text, (10, frame.shape[0] - 40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
 
     #     time_text = f"Time: {metrics['session_duration']:.1f}s | Frames: {metrics['total_frames']}"
     #     cv2.putText(frame, time_text, (10, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        pass
\ No newline at end of file
+        pass
+
+
+# Camera websocket output modes, negotiated with ?output=
+OUTPUT_FRAME = "frame"      # JSON with the base64 JPEG frame and metrics (default)
+OUTPUT_METRICS = "metrics"  # JSON with metrics only, optionally followed by a binary JPEG overlay frame
+
+
+def process_frame_bytes(detector, image_data, extra_metrics=None, output=OUTPUT_FRAME, overlay=False):
+    """
+    Decode, analyze and re-encode one camera frame.
+    Runs inside the frame executor, so everything CPU heavy for a frame happens here.
+    extra_metrics (e.g. frame pacing counters) are merged into the returned metrics.
+
+    Returns (response_text, overlay_jpeg_bytes) or None if the frame could not be decoded.
+    overlay_jpeg_bytes is only produced in metrics mode when overlay is requested.
+    """
+    # If receiving base64 string
+    if isinstance(image_data, str):
+        image_bytes = base64.b64decode(image_data)
+    else:
+        # If receiving raw bytes
+        image_bytes = image_data
+
+    # Convert bytes to numpy array
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+    if frame is None:
+        return None
+
+    send_frame = output == OUTPUT_FRAME or overlay
+    processed_frame, metrics = detector.process_frame(frame, draw=send_frame)
+    if extra_metrics:
+        metrics.update(extra_metrics)
+
+    if output == OUTPUT_METRICS:
+        overlay_bytes = None
+        if overlay:
+            # Raw JPEG as a binary message, no base64/JSON wrapping
+            _, buffer = cv2.imencode('.jpg', processed_frame)
+            overlay_bytes = buffer.tobytes()
+        return json.dumps({'metrics': metrics}), overlay_bytes
+
+    # Encode the processed frame back to base64
+    _, buffer = cv2.imencode('.jpg', processed_frame)
+    processed_frame_b64 = base64.b64encode(buffer).decode('utf-8')
+
+    response_data = {
+        'frame': processed_frame_b64,
+        'metrics': metrics
+    }
+    return json.dumps(response_data), None
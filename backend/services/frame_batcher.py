@@ -0,0 +1,167 @@
+import asyncio
+import os
+import time
+from collections import deque
+from . import frame_executor
+
+# Gather frames from many camera sessions into micro-batches before handing them to the workers
+FRAME_BATCHING = os.getenv("FRAME_BATCHING", "0") == "1"
+FRAME_BATCH_SIZE = int(os.getenv("FRAME_BATCH_SIZE", "16"))
+FRAME_BATCH_MAX_WAIT_MS = float(os.getenv("FRAME_BATCH_MAX_WAIT_MS", "10"))
+# Seconds of history used for the throughput figure in stats
+STATS_WINDOW = 10.0
+
+
+def run_chunk(jobs):
+    """Run a chunk of frame jobs back to back in one worker thread"""
+    results = []
+    for func, args in jobs:
+        try:
+            results.append((True, func(*args)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+class FrameBatchScheduler:
+    def __init__(self, batch_size=FRAME_BATCH_SIZE, max_wait_ms=FRAME_BATCH_MAX_WAIT_MS):
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(maxsize=batch_size * 4)
+        # One batch runs on the workers while the next one is being gathered
+        self.inflight_batches = asyncio.Semaphore(2)
+        self.task = None
+        # Dispatched batches, kept referenced until done
+        self.dispatches = set()
+
+        self.frames_processed = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.completed = deque()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        # Let the batches already on the workers finish, so their sessions get their results
+        await asyncio.gather(*self.dispatches, return_exceptions=True)
+
+    async def submit(self, func, *args):
+        """Queue one frame job and wait for its result; each session awaits before sending the next frame"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((func, args, future, time.monotonic()))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return await future
+
+    async def gather_batch(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        while True:
+            batch = await self.gather_batch()
+            await self.inflight_batches.acquire()
+            task = asyncio.create_task(self.dispatch(batch))
+            self.dispatches.add(task)
+            task.add_done_callback(self.dispatches.discard)
+
+    async def dispatch(self, batch):
+        try:
+            loop = asyncio.get_running_loop()
+            now = time.monotonic()
+            self.total_wait += sum(now - queued_at for _, _, _, queued_at in batch)
+
+            # Split the batch into one chunk per worker core
+            workers = min(frame_executor.FRAME_WORKERS, len(batch))
+            chunks = [batch[i::workers] for i in range(workers)]
+            chunk_results = await asyncio.gather(*[
+                loop.run_in_executor(frame_executor.executor, run_chunk, [(func, args) for func, args, _, _ in chunk])
+                for chunk in chunks
+            ], return_exceptions=True)
+
+            for chunk, results in zip(chunks, chunk_results):
+                for index, (_, _, future, _) in enumerate(chunk):
+                    if future.done():
+                        continue
+                    if isinstance(results, BaseException):
+                        future.set_exception(results)
+                        continue
+                    ok, value = results[index]
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+
+            self.frames_processed += len(batch)
+            self.batches += 1
+            self.completed.append((time.monotonic(), len(batch)))
+        finally:
+            self.inflight_batches.release()
+
+    def stats(self):
+        now = time.monotonic()
+        while self.completed and now - self.completed[0][0] > STATS_WINDOW:
+            self.completed.popleft()
+
+        return {
+            "batching_enabled": True,
+            "batch_size": self.batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "workers": frame_executor.FRAME_WORKERS,
+            "frames_processed": self.frames_processed,
+            "batches": self.batches,
+            "avg_batch_size": round(self.frames_processed / self.batches, 2) if self.batches else 0.0,
+            "throughput_fps": round(sum(n for _, n in self.completed) / STATS_WINDOW, 2),
+            "avg_queue_wait_ms": round(self.total_wait / self.frames_processed * 1000, 2) if self.frames_processed else 0.0,
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+scheduler = None
+
+
+def start_frame_scheduler():
+    global scheduler
+    if FRAME_BATCHING and scheduler is None:
+        scheduler = FrameBatchScheduler()
+        scheduler.start()
+        print(f"Frame batch scheduler started (batch size {FRAME_BATCH_SIZE}, max wait {FRAME_BATCH_MAX_WAIT_MS}ms)")
+
+
+async def stop_frame_scheduler():
+    global scheduler
+    if scheduler:
+        await scheduler.stop()
+        scheduler = None
+
+
+async def submit_frame_job(func, *args):
+    """Route a frame job through the batch scheduler when enabled, otherwise straight to the frame executor"""
+    if scheduler is None:
+        return await frame_executor.run_frame_job(func, *args)
+    return await scheduler.submit(func, *args)
+
+
+def frame_stats():
+    if scheduler is None:
+        return {"batching_enabled": False, "workers": frame_executor.FRAME_WORKERS, "max_pending": frame_executor.FRAME_MAX_PENDING}
+    return scheduler.stats()
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from .camera import get_cascades
+
+# OpenCV releases the GIL inside imdecode/detectMultiScale/imencode, so a thread pool
+# gives real parallelism without having to ship detector state to another process.
+FRAME_WORKERS = int(os.getenv("FRAME_WORKERS", os.cpu_count() or 4))
+FRAME_MAX_PENDING = int(os.getenv("FRAME_MAX_PENDING", FRAME_WORKERS * 2))
+
+executor = None
+pending_slots = None
+
+
+def start_frame_executor():
+    global executor, pending_slots
+    if executor is None:
+        # Parallelism comes from the pool, keep OpenCV from spawning its own threads per call
+        cv2.setNumThreads(1)
+        executor = ThreadPoolExecutor(max_workers=FRAME_WORKERS, thread_name_prefix="frame-worker", initializer=get_cascades)
+        pending_slots = asyncio.Semaphore(FRAME_MAX_PENDING)
+        warm_up_workers()
+        print(f"Frame executor started with {FRAME_WORKERS} workers (max {FRAME_MAX_PENDING} pending frames)")
+
+
+def warm_up_workers():
+    """Start every worker thread now so cascades are loaded before the first candidate connects"""
+    barrier = threading.Barrier(FRAME_WORKERS)
+
+    def wait_for_all_workers():
+        try:
+            barrier.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+
+    for future in [executor.submit(wait_for_all_workers) for _ in range(FRAME_WORKERS)]:
+        future.result()
+
+
+def shutdown_frame_executor():
+    global executor, pending_slots
+    if executor:
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = None
+        pending_slots = None
+
+
+async def run_frame_job(func, *args):
+    """
+    Run a CPU-bound frame job off the event loop.
+    Callers await each job before submitting the next one, which keeps per-session ordering.
+    When all slots are taken the caller waits here instead of reading more frames from its socket.
+    """
+    if executor is None:
+        start_frame_executor()
+
+    loop = asyncio.get_running_loop()
+    async with pending_slots:
+        return await loop.run_in_executor(executor, func, *args)
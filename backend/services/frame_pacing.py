@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+
+# Share of one CPU core a single camera stream may use for analysis
+FRAME_CPU_BUDGET = float(os.getenv("FRAME_CPU_BUDGET", "0.25"))
+FRAME_MIN_FPS = float(os.getenv("FRAME_MIN_FPS", "1"))
+FRAME_MAX_FPS = float(os.getenv("FRAME_MAX_FPS", "15"))
+
+
+class LatestFrameSlot:
+    """Holds only the newest pending frame, older unprocessed frames are dropped."""
+
+    def __init__(self):
+        self.frame = None
+        self.closed = False
+        self.dropped = 0
+        self.received = 0
+        self._ready = asyncio.Event()
+
+    def put(self, frame):
+        self.received += 1
+        if self.frame is not None:
+            self.dropped += 1
+        self.frame = frame
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def get(self):
+        """Wait for and take the newest frame. Returns None once the slot is closed."""
+        while self.frame is None:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        frame, self.frame = self.frame, None
+        return frame
+
+
+class AdaptiveFrameRate:
+    """
+    Paces analysis so each stream stays within FRAME_CPU_BUDGET of a core.
+    The interval between analyzed frames follows a moving average of the measured CPU cost.
+    """
+
+    def __init__(self, cpu_budget=FRAME_CPU_BUDGET, min_fps=FRAME_MIN_FPS, max_fps=FRAME_MAX_FPS):
+        self.cpu_budget = cpu_budget
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.avg_cost = None
+        self.analyzed = 0
+        self.next_due = 0.0
+
+    @property
+    def target_fps(self):
+        if not self.avg_cost:
+            return self.max_fps
+        fps = self.cpu_budget / self.avg_cost
+        return max(self.min_fps, min(self.max_fps, fps))
+
+    def record(self, cost):
+        self.analyzed += 1
+        self.avg_cost = cost if self.avg_cost is None else 0.8 * self.avg_cost + 0.2 * cost
+        self.next_due = time.monotonic() + 1.0 / self.target_fps
+
+    async def wait(self):
+        delay = self.next_due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def timed_job(func, *args):
+    """Run func in the current worker thread and return (result, CPU seconds spent)."""
+    start = time.thread_time()
+    result = func(*args)
+    return result, time.thread_time() - start
@@ -0,0 +1,67 @@
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, Optional
+from .mongo_op import get_intake_cache_entry, save_intake_cache_entry
+
+# In-process LRU in front of the Mongo intake_cache collection (TTL-evicted, shared by all server processes)
+INTAKE_CACHE_ENTRIES = int(os.getenv("INTAKE_CACHE_ENTRIES", "1000"))
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def resume_text_key(pdf_hash: str) -> str:
+    return f"text:{pdf_hash}"
+
+
+def questions_key(resume_hash: str, jd_hash: str, prompt_version: str) -> str:
+    return f"questions:{content_hash(f'{resume_hash}:{jd_hash}:{prompt_version}')}"
+
+
+class IntakeCache:
+    def __init__(self, max_entries=INTAKE_CACHE_ENTRIES):
+        self.memory = OrderedDict()
+        self.max_entries = max_entries
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0}
+
+    def put_memory(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return value
+
+        value = await get_intake_cache_entry(key)
+        if value is not None:
+            self.stats["mongo_hits"] += 1
+            self.put_memory(key, value)
+            return value
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, key: str, value: Any):
+        self.put_memory(key, value)
+        await save_intake_cache_entry(key, value)
+
+    def snapshot(self):
+        lookups = self.stats["memory_hits"] + self.stats["mongo_hits"] + self.stats["misses"]
+        hits = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
+
+
+intake_cache = IntakeCache()
@@ -0,0 +1,63 @@
+import base64
+import json
+import struct
+from fastapi import WebSocket
+
+# Wire protocol of /ws/interview/{id}/, negotiated with ?protocol=
+# v1 (default): audio is sent as text, AI_AUDIO_ARRAY:/AI_AUDIO_PART: + JSON list of base64 WAV segments
+# v2: audio is sent as binary frames, one per decoded WAV segment, behind AUDIO_FRAME_HEADER.
+#     Text control messages (AI_QUESTION_TEXT:, AI_QUESTION_PART:, ERROR:, ...) are unchanged.
+PROTOCOL_V1 = 1
+PROTOCOL_V2 = 2
+SUPPORTED_PROTOCOLS = (PROTOCOL_V1, PROTOCOL_V2)
+
+# version, frame type, part index (sentence index when streaming, else 0), segment index, segment count
+AUDIO_FRAME_HEADER = struct.Struct("!BBHHH")
+FRAME_QUESTION_AUDIO = 1
+FRAME_QUESTION_AUDIO_PART = 2
+
+
+def parse_protocol_version(value) -> int:
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        return PROTOCOL_V1
+    return version if version in SUPPORTED_PROTOCOLS else PROTOCOL_V1
+
+
+class InterviewChannel:
+    """Sends interviewer questions and their audio in the negotiated protocol version"""
+
+    def __init__(self, websocket: WebSocket, version: int = PROTOCOL_V1):
+        self.websocket = websocket
+        self.version = version
+
+    async def send_hello(self):
+        if self.version >= PROTOCOL_V2:
+            await self.websocket.send_text(f"PROTOCOL:{self.version}")
+
+    async def send_audio_frames(self, frame_type: int, part_index: int, audios: list):
+        for segment_index, audio_b64 in enumerate(audios):
+            header = AUDIO_FRAME_HEADER.pack(self.version, frame_type, part_index, segment_index, len(audios))
+            await self.websocket.send_bytes(header + base64.b64decode(audio_b64))
+
+    async def send_question(self, text: str, audios: list):
+        await self.websocket.send_text(f"AI_QUESTION_TEXT:{text}")
+        if self.version >= PROTOCOL_V2:
+            await self.send_audio_frames(FRAME_QUESTION_AUDIO, 0, audios)
+            return
+
+        audio_message = {"type": "audio_array", "audios": audios}
+        await self.websocket.send_text(f"AI_AUDIO_ARRAY:{json.dumps(audio_message)}")
+
+    async def send_question_part(self, index: int, sentence: str, audios: list):
+        await self.websocket.send_text(f"AI_QUESTION_PART:{sentence}")
+        if self.version >= PROTOCOL_V2:
+            await self.send_audio_frames(FRAME_QUESTION_AUDIO_PART, index, audios)
+            return
+
+        audio_message = {"type": "audio_array", "audios": audios, "index": index}
+        await self.websocket.send_text(f"AI_AUDIO_PART:{json.dumps(audio_message)}")
+
+    async def send_question_end(self, text: str):
+        await self.websocket.send_text(f"AI_QUESTION_END:{text}")
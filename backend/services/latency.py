@@ -0,0 +1,46 @@
+import bisect
+
+# Upper bounds of the histogram buckets in milliseconds, the last bucket catches everything above
+LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2000, 5000, 10000, 30000]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram, cheap enough to observe on every external call"""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile"""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(self.buckets_ms[i]) if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        labels = [f"le_{b}ms" for b in self.buckets_ms] + ["inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip(labels, self.counts)),
+        }
@@ -0,0 +1,64 @@
+import json
+import os
+from typing import Any, AsyncIterator, Dict, Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+from .mongo_op import public_document
+
+# Largest page a client can ask for with ?limit=
+LIST_MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", "500"))
+
+FORMAT_JSON = "json"
+FORMAT_NDJSON = "ndjson"
+LIST_FORMAT_PATTERN = f"^({FORMAT_JSON}|{FORMAT_NDJSON})$"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+async def iterate(documents) -> AsyncIterator[Dict[str, Any]]:
+    for doc in documents:
+        yield doc
+
+
+def dump(doc: Dict[str, Any]) -> str:
+    return json.dumps(public_document(doc), default=str)
+
+
+async def serialize(first: Optional[Dict[str, Any]], rest: AsyncIterator[Dict[str, Any]], output_format: str) -> AsyncIterator[str]:
+    """Serialize documents one at a time as they come off the cursor, as a JSON array or NDJSON"""
+    if output_format == FORMAT_NDJSON:
+        if first is not None:
+            yield dump(first) + "\n"
+            async for doc in rest:
+                yield dump(doc) + "\n"
+        return
+
+    yield "["
+    if first is not None:
+        yield dump(first)
+        async for doc in rest:
+            yield "," + dump(doc)
+    yield "]"
+
+
+async def documents_response(cursor, limit: Optional[int], output_format: str, not_found: Optional[str] = None):
+    """
+    Stream the documents of a cursor from paged_cursor.
+    Without a limit every match is streamed, with one the page is at most limit documents and
+    the cursor for the next page, if any, is sent in the X-Next-Cursor header (pass it back as ?after=).
+    """
+    headers = {}
+    if limit:
+        documents = await cursor.to_list(limit + 1)
+        if len(documents) > limit:
+            documents = documents[:limit]
+            headers[NEXT_CURSOR_HEADER] = str(documents[-1]["_id"])
+        rest = iterate(documents[1:])
+        first = documents[0] if documents else None
+    else:
+        rest = aiter(cursor)
+        first = await anext(rest, None)
+
+    if first is None and not_found:
+        return JSONResponse(status_code=404, content={"message": not_found})
+
+    media_type = "application/x-ndjson" if output_format == FORMAT_NDJSON else "application/json"
+    return StreamingResponse(serialize(first, rest, output_format), media_type=media_type, headers=headers)
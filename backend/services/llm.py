@@ -1,8 +1,12 @@
-from typing import IO, Dict, Any, List
-from litellm import acompletion
+from typing import IO, Dict, Any, List, AsyncIterator, Optional
+import asyncio
 import json
+import time
 from .model_schema import ResumeAnalysisResult, InterviewAnalysis
-from .mongo_op import get_jd_by_id, update_interview_data, update_candidate_report
+from .mongo_op import get_jd_by_id, update_interview_data, update_candidate_report, get_proctoring_summary
+from .proctoring_telemetry import telemetry
+from .latency import LatencyHistogram
+from .llm_gateway import llm_gateway, PRIORITY_INTERVIEW, PRIORITY_REPORT, PRIORITY_PREP
 import os
 from dotenv import load_dotenv
 
@@ -12,6 +16,19 @@ os.environ['GEMINI_API_KEY'] = os.getenv('GEMINI_API_KEY')
 os.environ['GROQ_API_KEY'] = os.getenv('GROQ_API_KEY')
 # os.environ['LITELLM_LOG'] = "DEBUG"
 
+FALLBACK_FOLLOW_UP = "That's interesting. Could you elaborate more on that point?"
+
+# Explicit provider prompt caching for the per-interview system prompt
+LLM_PROMPT_CACHING = os.getenv("LLM_PROMPT_CACHING", "0") == "1"
+# Unsummarized history allowed in a follow-up prompt before older turns are compacted, and turns always kept verbatim
+FOLLOW_UP_HISTORY_TOKEN_BUDGET = int(os.getenv("FOLLOW_UP_HISTORY_TOKEN_BUDGET", "3000"))
+FOLLOW_UP_KEEP_RECENT_MESSAGES = int(os.getenv("FOLLOW_UP_KEEP_RECENT_MESSAGES", "4"))
+
+follow_up_latency = LatencyHistogram()
+follow_up_stats = {"turns": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "compactions": 0}
+# Part of the cache key of generated interview questions, bump it whenever the prep prompt changes
+PREP_PROMPT_VERSION = "1"
+
 
 async def call_llm_for_interview_prep(resume_text: str, jd_text: str) -> Dict[str, Any]:
     prompt = f"""
@@ -31,8 +48,8 @@ Job Description Text:
 ```
 """
     try:
-        response = await acompletion(
-            model="gemini/gemini-2.5-flash-preview-04-17",  #"groq/qwen-qwq-32b", # 
+        response = await llm_gateway.complete(
+            PRIORITY_PREP,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.4,
             response_format=ResumeAnalysisResult,
@@ -48,7 +65,7 @@ Job Description Text:
         raise e
 
 
-async def get_follow_up_question(message_history: List[Dict[str, str]], interview_data: dict) -> str:
+def build_follow_up_system_prompt(interview_data: dict) -> str:
     system_prompt = f"""You are an AI interviewer conducting a job interview.
 
 CANDIDATE INFORMATION:
@@ -79,17 +96,108 @@ Be conversational and sound natural. Your response should ONLY contain the quest
 If the candidate wants to quit the interview or if the answer to last *Fixed Question* has been provided by candidate, respond ONLY with: "[END]"
 Do not add any commentary, explanations, or notes.
 """
+    return system_prompt
 
-    system_message = {"role": "system", "content": system_prompt}
-    
-    messages = [system_message] + message_history
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    # Rough count (~4 characters per token), only used to decide when to compact
+    return sum(len(m.get("content") or "") for m in messages) // 4
+
+
+class FollowUpContext:
+    """
+    Per-interview prompt state for follow-up questions.
+    The system prompt (resume and fixed questions) is built once and stays byte-identical across turns,
+    so provider prefix caching can reuse it. Turns older than the token budget are folded into a rolling
+    summary in the background, which keeps the input size per turn bounded however long the interview runs.
+    """
+
+    def __init__(self, interview_data: dict):
+        content = build_follow_up_system_prompt(interview_data)
+        if LLM_PROMPT_CACHING:
+            # Explicit provider cache for the stable prefix (Gemini 2.5 also caches identical prefixes implicitly)
+            content = [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+        self.system_message = {"role": "system", "content": content}
+        self.summary = None
+        self.summarized_upto = 0
+        self.compaction = None
+
+    def build_messages(self, message_history: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        messages = [self.system_message]
+        if self.summary:
+            messages.append({"role": "user", "content": f"Summary of the earlier part of the interview:\n{self.summary}"})
+            messages.append({"role": "assistant", "content": "Understood, continuing the interview."})
+        return messages + message_history[self.summarized_upto:]
+
+    def collect_compaction(self):
+        """
+        Take in the summary if the background compaction has finished. A running one is never waited for,
+        the turn is sent with the unsummarized history instead of queueing behind report-priority calls.
+        """
+        if self.compaction and self.compaction.done():
+            self.compaction = None
+
+    def schedule_compaction(self, message_history: List[Dict[str, str]]):
+        """Start folding old turns into the summary once the unsummarized history is over budget"""
+        recent = message_history[self.summarized_upto:]
+        if self.compaction or estimate_tokens(recent) <= FOLLOW_UP_HISTORY_TOKEN_BUDGET:
+            return
+        upto = len(message_history) - FOLLOW_UP_KEEP_RECENT_MESSAGES
+        if upto <= self.summarized_upto:
+            return
+        self.compaction = asyncio.create_task(self.compact(message_history[self.summarized_upto:upto], upto))
+
+    async def compact(self, messages: List[Dict[str, str]], upto: int):
+        transcript = "\n\n".join(
+            f"{'Interviewer' if m.get('role') == 'assistant' else 'Candidate'}: {m.get('content', '')}" for m in messages
+        )
+        prompt = f"""Update the running summary of a job interview with the new exchanges below.
+Keep every question the interviewer asked (word for word for the fixed questions) and the key facts, examples and claims from the candidate's answers.
+Be concise.
+
+Current summary:
+{self.summary or "(none)"}
+
+New exchanges:
+{transcript}
+"""
+        try:
+            # Background work, queued behind live interview turns
+            response = await llm_gateway.complete(
+                PRIORITY_REPORT,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.2,
+            )
+            self.summary = response['choices'][0]['message']['content'].strip()
+            self.summarized_upto = upto
+            follow_up_stats["compactions"] += 1
+        except Exception as e:
+            # Keep sending the full history, compaction is retried after the next question
+            print(f"Error summarizing interview history: {e}")
+
+    def record_usage(self, usage, started_at: float):
+        follow_up_latency.observe(time.perf_counter() - started_at)
+        prompt_tokens = getattr(usage, "prompt_tokens", None) if usage else None
+        if prompt_tokens:
+            follow_up_stats["turns"] += 1
+            follow_up_stats["prompt_tokens"] += prompt_tokens
+            cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+            follow_up_stats["cached_prompt_tokens"] += cached or 0
+
+
+async def get_follow_up_question(message_history: List[Dict[str, str]], interview_data: dict, context: Optional[FollowUpContext] = None) -> str:
+    context = context or FollowUpContext(interview_data)
+    context.collect_compaction()
+    messages = context.build_messages(message_history)
     
     try:
-        response = await acompletion(
-            model="gemini/gemini-2.5-flash-preview-04-17",
+        started_at = time.perf_counter()
+        response = await llm_gateway.complete(
+            PRIORITY_INTERVIEW,
             messages=messages,
             temperature=0.6,
         )
+        context.record_usage(response.get('usage'), started_at)
         print(response)
         
         follow_up_question = response['choices'][0]['message']['content']
@@ -98,7 +206,51 @@ Do not add any commentary, explanations, or notes.
     except Exception as e:
         print(f"Error generating follow-up question: {e}")
         # Fallback response
-        return "That's interesting. Could you elaborate more on that point?"
+        return FALLBACK_FOLLOW_UP
+
+
+async def stream_follow_up_question(message_history: List[Dict[str, str]], interview_data: dict, context: Optional[FollowUpContext] = None) -> AsyncIterator[str]:
+    """
+    Same as get_follow_up_question but yields the text as the model generates it.
+    """
+    context = context or FollowUpContext(interview_data)
+    context.collect_compaction()
+    messages = context.build_messages(message_history)
+
+    produced = False
+    try:
+        started_at = time.perf_counter()
+        usage = None
+        async for chunk in llm_gateway.stream(
+            PRIORITY_INTERVIEW,
+            messages=messages,
+            temperature=0.6,
+            stream_options={"include_usage": True},
+        ):
+            usage = getattr(chunk, 'usage', None) or usage
+            if not chunk['choices']:
+                continue
+            delta = chunk['choices'][0]['delta'].get('content')
+            if delta:
+                produced = True
+                yield delta
+        context.record_usage(usage, started_at)
+
+    except Exception as e:
+        print(f"Error streaming follow-up question: {e}")
+        if not produced:
+            # Fallback response
+            yield FALLBACK_FOLLOW_UP
+
+
+def get_follow_up_stats() -> Dict[str, Any]:
+    turns = follow_up_stats["turns"]
+    return {
+        **follow_up_stats,
+        "avg_prompt_tokens": round(follow_up_stats["prompt_tokens"] / turns, 1) if turns else 0.0,
+        "latency": follow_up_latency.snapshot(),
+        "gateway": llm_gateway.snapshot(),
+    }
 
 
 async def generate_candidate_report(interview_data: dict) -> Dict[str, Any]:
@@ -122,6 +274,13 @@ The analysis should be concise and to the point, focusing on the candidate's per
             role = "Interviewer" if msg.get("role") == "assistant" else "Candidate"
             content = msg.get("content", "")
             transcript += f"{role}: {content}\n\n"
+
+        # Write out buckets still held in memory so the report sees the end of the interview
+        await telemetry.flush()
+        proctoring_summary = await get_proctoring_summary(str(interview_data['_id']))
+        proctoring = "No camera proctoring data recorded."
+        if proctoring_summary:
+            proctoring = f"Violation counts over {proctoring_summary['totals'].get('frames', 0)} analyzed camera frames: {proctoring_summary['totals']}"
         
         INPUT_PROMPT = f"""
 Please analyze this interview and provide a analysis report.
@@ -137,6 +296,9 @@ Resume:
 
 Interview Transcript:
 {transcript}
+
+Camera Proctoring:
+{proctoring}
 """
 
         messages = [
@@ -144,8 +306,8 @@ Interview Transcript:
             {"role": "user", "content": INPUT_PROMPT}
         ]
 
-        response = await acompletion(
-            model="gemini/gemini-2.5-flash-preview-04-17",
+        response = await llm_gateway.complete(
+            PRIORITY_REPORT,
             messages=messages,
             response_format=InterviewAnalysis,
             temperature=0.5,
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import litellm
+from .model_schema import ResumeAnalysisResult, InterviewAnalysis
+
+# live (default), mock (canned schema-valid responses, no network),
+# record (live, and every response is appended to LLM_RECORDINGS) or replay (recorded responses, mock on a miss)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "live")
+LLM_RECORDINGS = os.getenv("LLM_RECORDINGS", "llm_recordings.jsonl")
+LLM_MOCK_LATENCY_MS = float(os.getenv("LLM_MOCK_LATENCY_MS", "800"))
+# Follow-up turns the mock interviewer asks before answering [END]
+LLM_MOCK_INTERVIEW_TURNS = int(os.getenv("LLM_MOCK_INTERVIEW_TURNS", "3"))
+
+MOCK_PAYLOADS = {
+    ResumeAnalysisResult: {
+        "candidate_name": "Alex Candidate",
+        "candidate_email": "alex.candidate@example.com",
+        "interview_questions": [
+            "Hello and welcome! Could you please introduce yourself and walk me through your background?",
+            "Tell me about a project where you had to improve the performance of a backend service. What did you measure and what did you change?",
+        ],
+    },
+    InterviewAnalysis: {
+        "summary": "The candidate communicated clearly and gave concrete examples from recent backend work.",
+        "strengths": ["Clear communication", "Hands-on experience with Python services"],
+        "weaknesses": ["Limited detail on testing strategy"],
+        "suggestions": ["Prepare examples that quantify the impact of past work"],
+    },
+}
+
+MOCK_FOLLOW_UPS = [
+    "That's interesting. Could you give me a specific example of how you handled that?",
+    "What was the hardest trade-off you had to make there, and why?",
+    "How did you measure whether that change actually worked?",
+]
+
+MOCK_SUMMARY = "The interviewer asked the candidate to introduce themselves and discussed their recent backend projects."
+
+
+def mock_content(messages, response_format=None):
+    if response_format is not None:
+        if response_format not in MOCK_PAYLOADS:
+            raise ValueError(f"No mock payload for response format {response_format!r}")
+        # Validate so a schema change is caught here instead of in the caller
+        return response_format.model_validate(MOCK_PAYLOADS[response_format]).model_dump_json()
+
+    if messages and messages[0].get("role") == "system":
+        follow_ups = sum(1 for m in messages[1:] if m.get("role") == "assistant") - 1
+        if follow_ups >= LLM_MOCK_INTERVIEW_TURNS:
+            return "[END]"
+        return MOCK_FOLLOW_UPS[max(follow_ups, 0) % len(MOCK_FOLLOW_UPS)]
+
+    return MOCK_SUMMARY
+
+
+def recording_key(kwargs):
+    """Identifies a request independently of the model it was routed to"""
+    request = {
+        "messages": kwargs.get("messages"),
+        "temperature": kwargs.get("temperature"),
+        "response_format": getattr(kwargs.get("response_format"), "__name__", kwargs.get("response_format")),
+    }
+    return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LLMBackend:
+    name = "base"
+
+    def __init__(self):
+        self.stats = {"calls": 0}
+
+    async def acompletion(self, model, **kwargs):
+        raise NotImplementedError
+
+    async def canned(self, model, content, latency, **kwargs):
+        """litellm's own mock response, so callers get real ModelResponse / stream objects"""
+        await asyncio.sleep(latency)
+        return await litellm.acompletion(model=model, mock_response=content, **kwargs)
+
+
+class LiveLLMBackend(LLMBackend):
+    name = "live"
+
+    async def acompletion(self, model, **kwargs):
+        self.stats["calls"] += 1
+        return await litellm.acompletion(model=model, **kwargs)
+
+
+class MockLLMBackend(LLMBackend):
+    """Offline stand-in: schema-valid canned responses after a fixed delay"""
+    name = "mock"
+
+    def __init__(self, latency_ms=LLM_MOCK_LATENCY_MS):
+        super().__init__()
+        self.latency = latency_ms / 1000
+
+    async def acompletion(self, model, **kwargs):
+        self.stats["calls"] += 1
+        content = mock_content(kwargs.get("messages"), kwargs.get("response_format"))
+        return await self.canned(model, content, self.latency, **kwargs)
+
+
+class RecordingStream:
+    """Passes a live stream through and records the full text once it is complete"""
+
+    def __init__(self, response, on_complete):
+        self.response = response
+        self.on_complete = on_complete
+        self.parts = []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self.response.__anext__()
+        except StopAsyncIteration:
+            self.on_complete("".join(self.parts))
+            raise
+        if chunk["choices"]:
+            self.parts.append(chunk["choices"][0]["delta"].get("content") or "")
+        return chunk
+
+
+class RecordLLMBackend(LLMBackend):
+    name = "record"
+
+    def __init__(self, path=LLM_RECORDINGS):
+        super().__init__()
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, key, content, started_at):
+        entry = {"key": key, "content": content, "latency_ms": round((time.perf_counter() - started_at) * 1000, 1)}
+        with self.lock, open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    async def acompletion(self, model, **kwargs):
+        self.stats["calls"] += 1
+        key = recording_key(kwargs)
+        started_at = time.perf_counter()
+        response = await litellm.acompletion(model=model, **kwargs)
+        if kwargs.get("stream"):
+            return RecordingStream(response, lambda content: self.write(key, content, started_at))
+        self.write(key, response["choices"][0]["message"]["content"], started_at)
+        return response
+
+
+class ReplayLLMBackend(LLMBackend):
+    """Serves recorded responses with their recorded latency, unknown requests get the mock response"""
+    name = "replay"
+
+    def __init__(self, path=LLM_RECORDINGS, latency_ms=LLM_MOCK_LATENCY_MS):
+        super().__init__()
+        self.recordings = {}
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.recordings[entry["key"]] = entry
+        self.latency = latency_ms / 1000
+        self.stats.update({"hits": 0, "misses": 0})
+
+    async def acompletion(self, model, **kwargs):
+        self.stats["calls"] += 1
+        entry = self.recordings.get(recording_key(kwargs))
+        if entry is None:
+            self.stats["misses"] += 1
+            content = mock_content(kwargs.get("messages"), kwargs.get("response_format"))
+            return await self.canned(model, content, self.latency, **kwargs)
+
+        self.stats["hits"] += 1
+        return await self.canned(model, entry["content"], entry["latency_ms"] / 1000, **kwargs)
+
+
+LLM_BACKENDS = {
+    LiveLLMBackend.name: LiveLLMBackend,
+    MockLLMBackend.name: MockLLMBackend,
+    RecordLLMBackend.name: RecordLLMBackend,
+    ReplayLLMBackend.name: ReplayLLMBackend,
+}
+
+if LLM_BACKEND not in LLM_BACKENDS:
+    raise ValueError(f"Unknown LLM_BACKEND {LLM_BACKEND!r}, expected one of {list(LLM_BACKENDS)}")
+
+llm_backend = LLM_BACKENDS[LLM_BACKEND]()
@@ -0,0 +1,243 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import Any, AsyncIterator
+from .llm_backends import llm_backend
+from .latency import LatencyHistogram
+
+# Request classes, highest priority first: live interview turns, candidate reports, resume prep
+PRIORITY_INTERVIEW = "interview"
+PRIORITY_REPORT = "report"
+PRIORITY_PREP = "prep"
+
+LLM_PRIMARY_MODEL = os.getenv("LLM_PRIMARY_MODEL", "gemini/gemini-2.5-flash-preview-04-17")
+# Used when the primary model breaches a class SLO or fails, "" disables fallback
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "groq/llama-3.3-70b-versatile")
+# Calls in flight across all classes, free slots go to the highest priority waiter
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# After this many SLO breaches in a row a class goes straight to the fallback model for the cooldown
+LLM_BREACHES_TO_TRIP = int(os.getenv("LLM_BREACHES_TO_TRIP", "3"))
+LLM_FALLBACK_COOLDOWN = float(os.getenv("LLM_FALLBACK_COOLDOWN", "60"))
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+class PriorityClass:
+    """
+    Per-class limits: max concurrent calls, SLO (time the primary model gets before falling back)
+    and deadline (total time for the call, queueing included)
+    """
+
+    def __init__(self, name, rank, max_concurrency, slo, deadline):
+        self.name = name
+        self.rank = rank
+        self.max_concurrency = max_concurrency
+        self.slo = slo
+        self.deadline = deadline
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.latency = LatencyHistogram()
+        self.queue_wait = LatencyHistogram()
+        self.stats = {"calls": 0, "in_flight": 0, "queued": 0, "slo_breaches": 0, "fallbacks": 0, "timeouts": 0, "errors": 0}
+        self.consecutive_breaches = 0
+        self.fallback_until = 0.0
+
+    @classmethod
+    def from_env(cls, name, rank, max_concurrency, slo, deadline):
+        prefix = f"LLM_{name.upper()}"
+        return cls(
+            name,
+            rank,
+            int(os.getenv(f"{prefix}_CONCURRENCY", str(max_concurrency))),
+            float(os.getenv(f"{prefix}_SLO", str(slo))),
+            float(os.getenv(f"{prefix}_DEADLINE", str(deadline))),
+        )
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            "max_concurrency": self.max_concurrency,
+            "slo_s": self.slo,
+            "deadline_s": self.deadline,
+            "fallback_active": time.monotonic() < self.fallback_until,
+            "latency": self.latency.snapshot(),
+            "queue_wait": self.queue_wait.snapshot(),
+        }
+
+
+class PrioritySlots:
+    """Counting semaphore that hands freed slots to the waiter with the lowest rank first"""
+
+    def __init__(self, size):
+        self.free = size
+        self.waiters = []
+        self.counter = itertools.count()
+
+    async def acquire(self, rank):
+        if self.free > 0 and not self.waiters:
+            self.free -= 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (rank, next(self.counter), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Cancelled right after being handed a slot, pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self.waiters:
+            _, _, waiter = heapq.heappop(self.waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.free += 1
+
+
+class LLMGateway:
+    """
+    Single entry point for LLM calls: priority-aware concurrency limits, deadlines,
+    and fallback to a secondary model when the primary breaches the class SLO.
+    """
+
+    def __init__(self, primary_model=LLM_PRIMARY_MODEL, fallback_model=LLM_FALLBACK_MODEL, max_concurrency=LLM_MAX_CONCURRENCY):
+        self.primary_model = primary_model
+        self.fallback_model = fallback_model or None
+        self.slots = PrioritySlots(max_concurrency)
+        self.classes = {
+            PRIORITY_INTERVIEW: PriorityClass.from_env(PRIORITY_INTERVIEW, 0, 16, 4.0, 12.0),
+            PRIORITY_REPORT: PriorityClass.from_env(PRIORITY_REPORT, 1, 4, 45.0, 120.0),
+            PRIORITY_PREP: PriorityClass.from_env(PRIORITY_PREP, 2, 4, 30.0, 90.0),
+        }
+
+    def remaining(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMDeadlineExceeded()
+        return remaining
+
+    async def acquire(self, priority_class, deadline):
+        priority_class.stats["queued"] += 1
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(priority_class.semaphore.acquire(), self.remaining(deadline))
+            try:
+                await asyncio.wait_for(self.slots.acquire(priority_class.rank), self.remaining(deadline))
+            except BaseException:
+                priority_class.semaphore.release()
+                raise
+        except TimeoutError:
+            priority_class.stats["timeouts"] += 1
+            raise LLMDeadlineExceeded(f"No {priority_class.name} LLM slot within {priority_class.deadline}s")
+        finally:
+            priority_class.stats["queued"] -= 1
+        priority_class.queue_wait.observe(time.monotonic() - queued_at)
+        priority_class.stats["in_flight"] += 1
+
+    def release(self, priority_class):
+        priority_class.stats["in_flight"] -= 1
+        self.slots.release()
+        priority_class.semaphore.release()
+
+    def use_fallback(self, priority_class):
+        return self.fallback_model is not None and time.monotonic() < priority_class.fallback_until
+
+    def record_breach(self, priority_class, error):
+        print(f"LLM {priority_class.name} call on {self.primary_model} breached SLO or failed ({error!r}), falling back to {self.fallback_model}")
+        priority_class.stats["slo_breaches"] += 1
+        priority_class.consecutive_breaches += 1
+        if priority_class.consecutive_breaches >= LLM_BREACHES_TO_TRIP:
+            priority_class.fallback_until = time.monotonic() + LLM_FALLBACK_COOLDOWN
+
+    async def attempt(self, priority_class, deadline, call):
+        """Run call(model) on the primary model within the SLO, then on the fallback model within the deadline"""
+        if not self.use_fallback(priority_class):
+            try:
+                if self.fallback_model is None:
+                    return await asyncio.wait_for(call(self.primary_model), self.remaining(deadline))
+                result = await asyncio.wait_for(call(self.primary_model), min(priority_class.slo, self.remaining(deadline)))
+                priority_class.consecutive_breaches = 0
+                return result
+            except TimeoutError:
+                if self.fallback_model is None or deadline <= time.monotonic():
+                    priority_class.stats["timeouts"] += 1
+                    raise LLMDeadlineExceeded(f"{priority_class.name} LLM call exceeded {priority_class.deadline}s")
+                self.record_breach(priority_class, "slo")
+            except Exception as e:
+                if self.fallback_model is None:
+                    raise
+                self.record_breach(priority_class, e)
+
+        priority_class.stats["fallbacks"] += 1
+        try:
+            return await asyncio.wait_for(call(self.fallback_model), self.remaining(deadline))
+        except TimeoutError:
+            priority_class.stats["timeouts"] += 1
+            raise LLMDeadlineExceeded(f"{priority_class.name} LLM call exceeded {priority_class.deadline}s")
+
+    async def complete(self, priority: str, **kwargs) -> Any:
+        """acompletion() with the model chosen by the gateway"""
+        priority_class = self.classes[priority]
+        priority_class.stats["calls"] += 1
+        deadline = time.monotonic() + priority_class.deadline
+        await self.acquire(priority_class, deadline)
+        start = time.monotonic()
+        try:
+            return await self.attempt(priority_class, deadline, lambda model: llm_backend.acompletion(model=model, **kwargs))
+        except Exception:
+            priority_class.stats["errors"] += 1
+            raise
+        finally:
+            priority_class.latency.observe(time.monotonic() - start)
+            self.release(priority_class)
+
+    async def stream(self, priority: str, **kwargs) -> AsyncIterator[Any]:
+        """
+        Streaming acompletion(). The SLO applies to the first chunk, once the model has
+        started answering the rest of the stream only has to finish within the deadline.
+        """
+        priority_class = self.classes[priority]
+        priority_class.stats["calls"] += 1
+        deadline = time.monotonic() + priority_class.deadline
+        await self.acquire(priority_class, deadline)
+        start = time.monotonic()
+
+        async def open_stream(model):
+            response = await llm_backend.acompletion(model=model, stream=True, **kwargs)
+            return response, await response.__anext__()
+
+        try:
+            response, chunk = await self.attempt(priority_class, deadline, open_stream)
+            while True:
+                yield chunk
+                try:
+                    chunk = await asyncio.wait_for(response.__anext__(), self.remaining(deadline))
+                except StopAsyncIteration:
+                    return
+                except TimeoutError:
+                    priority_class.stats["timeouts"] += 1
+                    raise LLMDeadlineExceeded(f"{priority_class.name} LLM stream exceeded {priority_class.deadline}s")
+        except Exception:
+            priority_class.stats["errors"] += 1
+            raise
+        finally:
+            priority_class.latency.observe(time.monotonic() - start)
+            self.release(priority_class)
+
+    def snapshot(self):
+        return {
+            "backend": {"name": llm_backend.name, **llm_backend.stats},
+            "primary_model": self.primary_model,
+            "fallback_model": self.fallback_model,
+            "free_slots": self.slots.free,
+            "classes": {name: priority_class.snapshot() for name, priority_class in self.classes.items()},
+        }
+
+
+llm_gateway = LLMGateway()
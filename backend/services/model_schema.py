@@ -13,10 +13,12 @@ class InterviewDataStorage(BaseModel):
     resume_text: str
     jd_id: str
     interview_questions: List[str]
+    question_audio: Optional[List[Dict[str, Any]]] = None  # {"text", "cache_key"} of each fixed question pre-synthesized into the TTS cache
     status: Optional[str] = "interview_scheduled"
     message_history: Optional[List[MessageEntry]] = None
     analysis: Optional[Dict[str, Any]] = None  # To store the summary result
     summary_error: Optional[str] = None  # To store error message if summary generation fails
+    intake_error: Optional[str] = None  # Why question generation failed for a queued application
 
 
 class InterviewSummaryResponse(BaseModel):
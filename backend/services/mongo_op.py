@@ -1,5 +1,11 @@
+import base64
 import datetime
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+import hashlib
+import re
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+from pymongo import UpdateOne, ASCENDING
+from pymongo.errors import OperationFailure
 from typing import Optional, Dict, Any, List
 from .model_schema import InterviewDataStorage, MessageEntry
 from dotenv import load_dotenv
@@ -12,25 +18,45 @@ MONGO_URI = os.getenv("MONGO_URI")
 DATABASE_NAME = "ai_interview"
 client = None
 db = None
+resume_files = None
 JD_COLLECTION = "job_description"
 RESUME_COLLECTION = "uploaded_resume"
+RESUME_FILES_BUCKET = "resume_files"
+# Listing fields of uploaded_resume, the PDF lives in GridFS and the extracted text is only needed for interviews
+RESUME_METADATA_PROJECTION = {"resume_base64": 0, "resume_txt": 0}
 INTERVIEW_DATA_COLLECTION = "interview_data"
+PROCTORING_TELEMETRY_COLLECTION = "proctoring_telemetry"
+INTAKE_CACHE_COLLECTION = "intake_cache"
+# Cached resume text and generated questions expire this long after they were stored
+INTAKE_CACHE_TTL_SECONDS = int(os.getenv("INTAKE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
 
 
 async def connect_to_mongo():
-    global client, db
+    global client, db, resume_files
     try:
         if client is None:
             client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=5000)
         
         await client.admin.command('ping')
         db = client[DATABASE_NAME]
+        resume_files = AsyncIOMotorGridFSBucket(db, bucket_name=RESUME_FILES_BUCKET)
+        await db[RESUME_COLLECTION].create_index("jd_id")
+        await db[PROCTORING_TELEMETRY_COLLECTION].create_index([("interview_id", ASCENDING), ("bucket_start", ASCENDING)], unique=True)
+        await ensure_ttl_index(INTAKE_CACHE_COLLECTION, "created_at", INTAKE_CACHE_TTL_SECONDS)
         print("Successfully connected to MongoDB")
     except Exception as e:
         print(f"Error connecting to MongoDB: {str(e)}")
         raise e
 
 
+async def ensure_ttl_index(collection: str, field: str, ttl_seconds: int):
+    try:
+        await db[collection].create_index(field, expireAfterSeconds=ttl_seconds)
+    except OperationFailure:
+        # Index exists with another TTL, update it in place
+        await db.command("collMod", collection, index={"keyPattern": {field: 1}, "expireAfterSeconds": ttl_seconds})
+
+
 async def close_mongo_connection():
     global client
     if client:
@@ -55,22 +81,32 @@ async def save_jd(domain: str, jd_text: str) -> Dict[str, Any]:
     return {"error": "Failed to save or update job description"}
 
 
-async def get_jd_by_domain(domain: str):
-    try:
-        if domain == 'all':
-            cursor = db[JD_COLLECTION].find()
-        else:
-            cursor = db[JD_COLLECTION].find({"domain": domain})
-        jd_list = await cursor.to_list()
+def find_jds(domain: str, include_text: bool = False, limit: Optional[int] = None, after: Optional[str] = None):
+    """Cursor over the JDs of a domain ('all' for every domain), jd_text only when asked for"""
+    query = {} if domain == 'all' else {"domain": domain}
+    return paged_cursor(db[JD_COLLECTION], query, None if include_text else {"jd_text": 0}, limit, after)
 
-        for jd in jd_list:
-            if "_id" in jd:
-                jd["id"] = str(jd.pop("_id"))
 
-        return jd_list
-    except Exception as e:
-        print(f"Error fetching job descriptions: {e}")
-        return []
+def paged_cursor(collection, query: Dict[str, Any], projection: Optional[Dict[str, int]], limit: Optional[int], after: Optional[str]):
+    """
+    Documents in _id order, starting after the _id given as cursor.
+    With a limit one extra document is fetched, so the caller can tell whether another page follows.
+    """
+    if after:
+        query = {**query, "_id": {"$gt": ObjectId(after)}}
+    cursor = collection.find(query, projection).sort("_id", ASCENDING)
+    if limit:
+        cursor = cursor.limit(limit + 1)
+    return cursor
+
+
+def public_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """_id as "id" and every ObjectId as a string, ready for JSON"""
+    doc["id"] = str(doc.pop("_id"))
+    for key, value in doc.items():
+        if isinstance(value, ObjectId):
+            doc[key] = str(value)
+    return doc
 
 
 async def get_jd_by_id(jd_id: str) -> Optional[Dict[str, Any]]:
@@ -85,19 +121,53 @@ async def get_jd_by_id(jd_id: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-async def save_resume(candidate_name: str, resume_base64: str, resume_txt: str, jd_id: str):
+async def save_resume(candidate_name: str, resume_bytes: bytes, resume_txt: str, jd_id: str, resume_sha256: Optional[str] = None):
+    """
+    Store the PDF in GridFS and a lightweight metadata document in uploaded_resume.
+    Re-uploading the same file (same hash) keeps the stored copy.
+    """
+    existing = await db[RESUME_COLLECTION].find_one({"candidate_name": candidate_name}, {"resume_file_id": 1, "resume_sha256": 1})
+    if existing and existing.get("resume_file_id") and resume_sha256 and existing.get("resume_sha256") == resume_sha256:
+        file_id = existing["resume_file_id"]
+    else:
+        file_id = await resume_files.upload_from_stream(
+            f"{candidate_name}.pdf",
+            resume_bytes,
+            metadata={"candidate_name": candidate_name, "jd_id": jd_id, "content_type": "application/pdf"}
+        )
+
     result = await db[RESUME_COLLECTION].update_one(
         {"candidate_name": candidate_name},
-        {"$set": {"candidate_name": candidate_name, "resume_base64": resume_base64, "resume_txt": resume_txt, "jd_id": jd_id}},
+        {
+            "$set": {
+                "candidate_name": candidate_name,
+                "resume_file_id": file_id,
+                "resume_size": len(resume_bytes),
+                "resume_sha256": resume_sha256,
+                "content_type": "application/pdf",
+                "resume_txt": resume_txt,
+                "jd_id": jd_id,
+                "uploaded_at": datetime.datetime.utcnow()
+            },
+            # Documents from before GridFS storage carried the PDF inline
+            "$unset": {"resume_base64": ""}
+        },
         upsert=True
     )
+
+    if existing and existing.get("resume_file_id") and existing["resume_file_id"] != file_id:
+        try:
+            await resume_files.delete(existing["resume_file_id"])
+        except NoFile:
+            pass
+
     if result.upserted_id:
         return {"id": str(result.upserted_id), "candidate_name": candidate_name, "status": "created"}
     elif result.modified_count > 0:
-        doc = await db[RESUME_COLLECTION].find_one({"candidate_name": candidate_name, "jd_id": jd_id})
+        doc = await db[RESUME_COLLECTION].find_one({"candidate_name": candidate_name, "jd_id": jd_id}, {"_id": 1})
         return {"id": str(doc["_id"]) if doc else None, "candidate_name": candidate_name, "status": "updated"}
     else:
-        doc = await db[RESUME_COLLECTION].find_one({"candidate_name": candidate_name, "jd_id": jd_id})
+        doc = await db[RESUME_COLLECTION].find_one({"candidate_name": candidate_name, "jd_id": jd_id}, {"_id": 1})
         if doc:
             return {"id": str(doc["_id"]), "candidate_name": candidate_name, "status": "exists_no_change"}
     return {"error": "Failed to save or update resume"}
@@ -115,19 +185,68 @@ async def get_resume_by_name(candidate_name: str = None, resume_id: str = None):
     return resume
 
 
-async def get_resume_by_jd(jd_id: str):
-    try:
-        cursor = db[RESUME_COLLECTION].find({"jd_id": jd_id})
-        resumes = await cursor.to_list()
+def find_resumes_by_jd(jd_id: str, include_text: bool = False, limit: Optional[int] = None, after: Optional[str] = None):
+    """Cursor over the resume metadata of a JD, resume_txt only when asked for"""
+    projection = {"resume_base64": 0} if include_text else RESUME_METADATA_PROJECTION
+    return paged_cursor(db[RESUME_COLLECTION], {"jd_id": jd_id}, projection, limit, after)
+
+
+async def open_resume_file(resume_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The stored PDF of a resume: {"filename", "length", "stream"} with a GridFS download stream,
+    or {"filename", "length", "data"} for documents that still hold it as base64
+    """
+    resume = await db[RESUME_COLLECTION].find_one(
+        {"_id": ObjectId(resume_id)},
+        {"candidate_name": 1, "resume_file_id": 1, "resume_base64": 1}
+    )
+    if not resume:
+        return None
 
-        for res in resumes:
-            if "_id" in res:
-                res["id"] = str(res.pop("_id"))
+    # ASCII-only, it goes into a Content-Disposition header
+    filename = re.sub(r"[^A-Za-z0-9._-]+", "_", resume.get("candidate_name") or resume_id) + ".pdf"
+    if resume.get("resume_file_id"):
+        try:
+            stream = await resume_files.open_download_stream(resume["resume_file_id"])
+        except NoFile:
+            return None
+        return {"filename": filename, "length": stream.length, "stream": stream}
 
-        return resumes
+    if resume.get("resume_base64"):
+        data = base64.b64decode(resume["resume_base64"])
+        return {"filename": filename, "length": len(data), "data": data}
+    return None
+
+
+async def migrate_resume_to_gridfs(resume: Dict[str, Any]) -> Dict[str, Any]:
+    """Move one legacy document's inline base64 PDF into GridFS"""
+    try:
+        data = base64.b64decode(resume["resume_base64"])
+        file_id = await resume_files.upload_from_stream(
+            f"{resume.get('candidate_name')}.pdf",
+            data,
+            metadata={"candidate_name": resume.get("candidate_name"), "jd_id": resume.get("jd_id"), "content_type": "application/pdf"}
+        )
+        await db[RESUME_COLLECTION].update_one(
+            {"_id": resume["_id"]},
+            {
+                "$set": {
+                    "resume_file_id": file_id,
+                    "resume_size": len(data),
+                    "resume_sha256": hashlib.sha256(data).hexdigest(),
+                    "content_type": "application/pdf"
+                },
+                "$unset": {"resume_base64": ""}
+            }
+        )
+        return {"message": "Resume moved to GridFS", "id": str(resume["_id"]), "file_id": str(file_id)}
     except Exception as e:
-        print(f"Error fetching all resumes: {e}")
-        return []
+        print(f"Error migrating resume {resume.get('_id')}: {str(e)}")
+        return {"error": f"Error migrating resume: {str(e)}"}
+
+
+def find_legacy_resumes():
+    return db[RESUME_COLLECTION].find({"resume_base64": {"$exists": True}}, {"_id": 1, "candidate_name": 1, "jd_id": 1, "resume_base64": 1})
 
 
 async def save_interview_data(data: InterviewDataStorage):
@@ -175,6 +294,84 @@ async def update_interview_data(interview_id: str, status: str, message_history:
         return {"error": f"Error updating interview data: {str(e)}"}
 
 
+async def save_question_audio(interview_id: str, question_audio: List[Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        result = await db[INTERVIEW_DATA_COLLECTION].update_one(
+            {"_id": ObjectId(interview_id)},
+            {"$set": {"question_audio": question_audio}}
+        )
+
+        if result.matched_count == 0:
+            return {"error": f"No interview data found with ID {interview_id}"}
+
+        return {"message": "Question audio saved successfully", "id": interview_id}
+    except Exception as e:
+        print(f"Error saving question audio: {str(e)}")
+        return {"error": f"Error saving question audio: {str(e)}"}
+
+
+async def claim_intake_job(interview_id: str, stale_before: datetime.datetime) -> Optional[Dict[str, Any]]:
+    """
+    Atomically move a queued intake to processing, None if another worker already took it.
+    A job still processing since before stale_before was abandoned by a worker that died and is claimed again.
+    """
+    return await db[INTERVIEW_DATA_COLLECTION].find_one_and_update(
+        {"_id": ObjectId(interview_id), "$or": [
+            {"status": "intake_pending"},
+            {"status": "intake_processing", "intake_started_at": {"$lt": stale_before}}
+        ]},
+        {"$set": {"status": "intake_processing", "intake_started_at": datetime.datetime.utcnow()}}
+    )
+
+
+async def release_intake_job(interview_id: str) -> Dict[str, Any]:
+    """Put a job the worker gave up on (e.g. cancelled on shutdown) back to intake_pending"""
+    try:
+        await db[INTERVIEW_DATA_COLLECTION].update_one(
+            {"_id": ObjectId(interview_id), "status": "intake_processing"},
+            {"$set": {"status": "intake_pending"}, "$unset": {"intake_started_at": ""}}
+        )
+        return {"message": "Intake job released", "id": interview_id}
+    except Exception as e:
+        print(f"Error releasing intake job: {str(e)}")
+        return {"error": f"Error releasing intake job: {str(e)}"}
+
+
+async def complete_intake_job(interview_id: str, interview_questions: List[str], status: str, intake_error: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        result = await db[INTERVIEW_DATA_COLLECTION].update_one(
+            {"_id": ObjectId(interview_id)},
+            {"$set": {
+                "interview_questions": interview_questions,
+                "status": status,
+                "intake_error": intake_error,
+                "intake_completed_at": datetime.datetime.utcnow()
+            }}
+        )
+
+        if result.matched_count == 0:
+            return {"error": f"No interview data found with ID {interview_id}"}
+
+        return {"message": "Intake result saved successfully", "id": interview_id}
+    except Exception as e:
+        print(f"Error saving intake result: {str(e)}")
+        return {"error": f"Error saving intake result: {str(e)}"}
+
+
+async def get_pending_intake_ids(stale_before: datetime.datetime) -> List[str]:
+    """Queued intakes, and intakes stuck in processing since before stale_before"""
+    cursor = db[INTERVIEW_DATA_COLLECTION].find({"$or": [
+        {"status": "intake_pending"},
+        {"status": "intake_processing", "intake_started_at": {"$lt": stale_before}}
+    ]}, {"_id": 1})
+    return [str(doc["_id"]) for doc in await cursor.to_list()]
+
+
+async def get_intake_status(interview_id: str) -> Optional[Dict[str, Any]]:
+    """Only status and intake_error, for polling without loading resume text and question audio"""
+    return await db[INTERVIEW_DATA_COLLECTION].find_one({"_id": ObjectId(interview_id)}, {"status": 1, "intake_error": 1})
+
+
 async def update_candidate_report(interview_id: str, analysis_data: Dict[str, Any], status: str):
     try:
         result = await db[INTERVIEW_DATA_COLLECTION].update_one(
@@ -196,4 +393,70 @@ async def update_candidate_report(interview_id: str, analysis_data: Dict[str, An
 
 async def get_interview_data_by_id(id: str) -> Optional[Dict[str, Any]]:
     data = await db[INTERVIEW_DATA_COLLECTION].find_one({"_id": ObjectId(id)})
-    return data
\ No newline at end of file
+    return data
+
+
+async def save_proctoring_buckets(buckets: Dict[tuple, Dict[str, int]]) -> Dict[str, Any]:
+    """
+    Bulk upsert time-bucketed proctoring counters, keyed by (interview_id, bucket_start)
+    """
+    try:
+        operations = [
+            UpdateOne(
+                {"interview_id": interview_id, "bucket_start": bucket_start},
+                {"$inc": counts},
+                upsert=True
+            )
+            for (interview_id, bucket_start), counts in buckets.items()
+        ]
+        result = await db[PROCTORING_TELEMETRY_COLLECTION].bulk_write(operations, ordered=False)
+        return {"message": "Proctoring telemetry saved", "upserted": result.upserted_count, "modified": result.modified_count}
+    except Exception as e:
+        print(f"Error saving proctoring telemetry: {str(e)}")
+        return {"error": f"Error saving proctoring telemetry: {str(e)}"}
+
+
+async def get_proctoring_summary(interview_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Sum the pre-aggregated proctoring buckets of an interview
+    """
+    cursor = db[PROCTORING_TELEMETRY_COLLECTION].find({"interview_id": interview_id}, {"_id": 0, "interview_id": 0}).sort("bucket_start", ASCENDING)
+    buckets = await cursor.to_list()
+    if not buckets:
+        return None
+
+    totals = {}
+    for bucket in buckets:
+        for name, value in bucket.items():
+            if name != "bucket_start":
+                totals[name] = totals.get(name, 0) + value
+
+    return {
+        "interview_id": interview_id,
+        "first_bucket": buckets[0]["bucket_start"],
+        "last_bucket": buckets[-1]["bucket_start"],
+        "totals": totals,
+        "buckets": buckets
+    }
+
+
+async def get_intake_cache_entry(key: str) -> Optional[Any]:
+    try:
+        doc = await db[INTAKE_CACHE_COLLECTION].find_one({"_id": key}, {"value": 1})
+        return doc["value"] if doc else None
+    except Exception as e:
+        print(f"Error reading intake cache: {str(e)}")
+        return None
+
+
+async def save_intake_cache_entry(key: str, value: Any) -> Dict[str, Any]:
+    try:
+        await db[INTAKE_CACHE_COLLECTION].update_one(
+            {"_id": key},
+            {"$set": {"value": value, "created_at": datetime.datetime.utcnow()}},
+            upsert=True
+        )
+        return {"message": "Intake cache entry saved", "id": key}
+    except Exception as e:
+        print(f"Error saving intake cache entry: {str(e)}")
+        return {"error": f"Error saving intake cache entry: {str(e)}"}
@@ -0,0 +1,83 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .latency import LatencyHistogram
+from .utils import extract_text_from_pdf_bytes
+
+# PyPDF2 is pure Python and holds the GIL, so extraction runs in worker processes.
+# Documents are cut off after PDF_MAX_PAGES pages and abandoned after PDF_TIMEOUT seconds.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(os.cpu_count() or 2, 4)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "20"))
+PDF_TIMEOUT = float(os.getenv("PDF_TIMEOUT", "10"))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+
+executor = None
+
+pdf_latency = LatencyHistogram()
+pdf_stats = {"documents": 0, "pages": 0, "timeouts": 0, "errors": 0}
+
+
+class PDFExtractionError(Exception):
+    pass
+
+
+def start_pdf_executor():
+    global executor
+    if executor is None:
+        # spawn: forking a server process that already runs threads is not safe
+        executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        # Start the worker processes now instead of on the first upload
+        for _ in range(PDF_WORKERS):
+            executor.submit(time.sleep, 0)
+        print(f"PDF executor started with {PDF_WORKERS} worker processes")
+
+
+def shutdown_pdf_executor():
+    global executor
+    if executor:
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = None
+
+
+async def extract_pdf_text(pdf_bytes: bytes, max_pages: int = PDF_MAX_PAGES, timeout: float = PDF_TIMEOUT) -> str:
+    """Text of the first max_pages pages, extracted in a worker process"""
+    if executor is None:
+        start_pdf_executor()
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        # The worker enforces the timeout itself, the outer one also covers time spent queued
+        text, pages = await asyncio.wait_for(
+            loop.run_in_executor(executor, extract_text_from_pdf_bytes, pdf_bytes, max_pages, timeout),
+            timeout * 2
+        )
+    except TimeoutError as e:
+        pdf_stats["timeouts"] += 1
+        raise PDFExtractionError(f"PDF extraction timed out after {timeout}s") from e
+    except BrokenProcessPool as e:
+        # A worker died (e.g. out of memory on a hostile file), replace the pool for the next upload
+        pdf_stats["errors"] += 1
+        shutdown_pdf_executor()
+        raise PDFExtractionError("PDF extraction worker crashed") from e
+    except Exception as e:
+        pdf_stats["errors"] += 1
+        raise PDFExtractionError(f"Could not read PDF: {e}") from e
+    finally:
+        pdf_latency.observe(time.perf_counter() - start)
+
+    pdf_stats["documents"] += 1
+    pdf_stats["pages"] += pages
+    return text
+
+
+def get_pdf_stats():
+    return {
+        **pdf_stats,
+        "workers": PDF_WORKERS,
+        "max_pages": PDF_MAX_PAGES,
+        "latency": pdf_latency.snapshot(),
+    }
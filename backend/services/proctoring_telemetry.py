@@ -0,0 +1,75 @@
+import asyncio
+import datetime
+import os
+from .mongo_op import save_proctoring_buckets
+
+# Proctoring counters are summed per interview into fixed time buckets in memory
+# and written to Mongo in bulk every TELEMETRY_FLUSH_SECONDS, never once per frame
+TELEMETRY_BUCKET_SECONDS = int(os.getenv("TELEMETRY_BUCKET_SECONDS", "10"))
+TELEMETRY_FLUSH_SECONDS = float(os.getenv("TELEMETRY_FLUSH_SECONDS", "5"))
+
+
+class TelemetryAggregator:
+    def __init__(self, bucket_seconds=TELEMETRY_BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = {}
+
+    def bucket_start(self, now):
+        epoch = int(now.timestamp())
+        return datetime.datetime.utcfromtimestamp(epoch - epoch % self.bucket_seconds)
+
+    def record(self, interview_id, session):
+        """Add the latest analyzed frame of a ProctorSession to its interview's current bucket"""
+        key = (interview_id, self.bucket_start(datetime.datetime.utcnow()))
+        counts = self.buckets.get(key)
+        if counts is None:
+            counts = self.buckets[key] = {"frames": 0}
+
+        counts["frames"] += 1
+        for violation in session.frame_violations:
+            counts[violation] = counts.get(violation, 0) + 1
+
+    def drain(self):
+        buckets, self.buckets = self.buckets, {}
+        return buckets
+
+    async def flush(self):
+        buckets = self.drain()
+        if not buckets:
+            return
+        result = await save_proctoring_buckets(buckets)
+        if "error" in result:
+            print(f"Error flushing proctoring telemetry: {result['error']}")
+            # Keep the counts for the next flush
+            for key, counts in buckets.items():
+                pending = self.buckets.setdefault(key, {"frames": 0})
+                for name, value in counts.items():
+                    pending[name] = pending.get(name, 0) + value
+
+
+telemetry = TelemetryAggregator()
+flush_task = None
+
+
+async def flush_periodically():
+    while True:
+        await asyncio.sleep(TELEMETRY_FLUSH_SECONDS)
+        await telemetry.flush()
+
+
+def start_telemetry_flusher():
+    global flush_task
+    if flush_task is None:
+        flush_task = asyncio.create_task(flush_periodically())
+
+
+async def stop_telemetry_flusher():
+    global flush_task
+    if flush_task:
+        flush_task.cancel()
+        try:
+            await flush_task
+        except asyncio.CancelledError:
+            pass
+        flush_task = None
+    await telemetry.flush()
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+from .latency import LatencyHistogram
+from .tts_services import text_to_speech_sarvam_base64_array, find_question_audio
+
+prefetch_saved = LatencyHistogram()
+prefetch_stats = {"speculations": 0, "hits": 0, "lead_in_hits": 0, "misses": 0}
+
+
+class QuestionPrefetch:
+    """
+    Speculatively prepares the audio of the question most likely to come next (the next fixed question
+    not asked yet, or the closing text once all were asked) while the candidate is answering.
+    The LLM still decides the next question; the prepared audio is only used when its output matches.
+    """
+
+    def __init__(self, interview_data: dict, closing_text: str):
+        self.interview_data = interview_data
+        self.closing_text = closing_text
+        self.text = None
+        self.task = None
+        self.started_at = 0.0
+        self.ready_after = None
+
+    def predict(self, message_history: List[Dict[str, str]]) -> str:
+        asked = [m.get("content") or "" for m in message_history if m.get("role") == "assistant"]
+        for question in self.interview_data.get("interview_questions") or []:
+            if not any(question in text for text in asked):
+                return question
+        return self.closing_text
+
+    def start(self, message_history: List[Dict[str, str]], closing_only: bool = False):
+        """
+        Speculate on the next question. closing_only: only when that is the closing text, for streamed
+        questions whose audio is synthesized sentence by sentence and never taken from the speculation.
+        """
+        self.cancel()
+        text = self.predict(message_history)
+        if closing_only and text != self.closing_text:
+            return
+        self.text = text
+        self.started_at = time.perf_counter()
+        self.ready_after = None
+        self.task = asyncio.create_task(self.prepare(self.text))
+        prefetch_stats["speculations"] += 1
+
+    async def prepare(self, text: str) -> List[str]:
+        audios = await find_question_audio(self.interview_data, text) or await text_to_speech_sarvam_base64_array(text)
+        self.ready_after = time.perf_counter() - self.started_at
+        return audios
+
+    async def take(self, text: str) -> Optional[List[str]]:
+        """
+        Audio for text if the speculation covers it, else None (and the speculation is dropped).
+        The LLM may put a short lead-in before the fixed question, that part is synthesized on its own.
+        """
+        task, expected = self.task, self.text
+        self.task = self.text = None
+        if task is None:
+            return None
+
+        position = text.rfind(expected) if expected else -1
+        if position < 0 or text[position + len(expected):].strip():
+            task.cancel()
+            prefetch_stats["misses"] += 1
+            return None
+
+        waited_from = time.perf_counter()
+        try:
+            audios = await task
+        except Exception as e:
+            print(f"Error in speculative question synthesis: {e}")
+            prefetch_stats["misses"] += 1
+            return None
+        # Synthesis time that overlapped with the candidate's answer and the LLM call
+        prefetch_saved.observe(max(0.0, (self.ready_after or 0.0) - (time.perf_counter() - waited_from)))
+
+        lead_in = text[:position].strip()
+        if lead_in:
+            prefetch_stats["lead_in_hits"] += 1
+            audios = await text_to_speech_sarvam_base64_array(lead_in) + audios
+        else:
+            prefetch_stats["hits"] += 1
+        return audios
+
+    def cancel(self):
+        if self.task:
+            self.task.cancel()
+        self.task = self.text = None
+
+
+def get_prefetch_stats():
+    taken = prefetch_stats["hits"] + prefetch_stats["lead_in_hits"]
+    decided = taken + prefetch_stats["misses"]
+    return {
+        **prefetch_stats,
+        "hit_rate": round(taken / decided, 3) if decided else 0.0,
+        "latency_saved": prefetch_saved.snapshot(),
+    }
@@ -0,0 +1,205 @@
+import asyncio
+import datetime
+import os
+import time
+from typing import Any, Dict, List, Optional
+from .latency import LatencyHistogram
+from .llm import call_llm_for_interview_prep, PREP_PROMPT_VERSION
+from .intake_cache import intake_cache, content_hash, questions_key
+from .mongo_op import get_jd_by_id, get_interview_data_by_id, get_intake_status, claim_intake_job, release_intake_job, complete_intake_job, get_pending_intake_ids
+from .tts_services import presynthesize_questions
+
+# Applications are stored as intake_pending and their questions generated by INTAKE_WORKERS background workers.
+# Past INTAKE_MAX_PENDING queued applications new uploads get a 503 with Retry-After.
+INTAKE_WORKERS = int(os.getenv("INTAKE_WORKERS", "4"))
+INTAKE_MAX_PENDING = int(os.getenv("INTAKE_MAX_PENDING", "200"))
+INTAKE_RETRY_AFTER = int(os.getenv("INTAKE_RETRY_AFTER", "15"))
+INTAKE_POLL_INTERVAL = float(os.getenv("INTAKE_POLL_INTERVAL", "1"))
+# How long an interview websocket opened right after applying waits for its questions
+INTAKE_WAIT_TIMEOUT = float(os.getenv("INTAKE_WAIT_TIMEOUT", "180"))
+# A job processing for longer than this was abandoned by a worker that died and is queued again
+INTAKE_STALE_AFTER = float(os.getenv("INTAKE_STALE_AFTER", "300"))
+
+INTAKE_PENDING = "intake_pending"
+INTAKE_PROCESSING = "intake_processing"
+INTAKE_FAILED = "intake_failed"
+INTAKE_STATUSES = (INTAKE_PENDING, INTAKE_PROCESSING)
+
+intake_queue = None
+workers = []
+requeue_task = None
+# Finished-intake events for jobs queued in this process, so waiting interviews wake up without polling
+done_events = {}
+# Pre-synthesis started by the workers, kept referenced until done
+background = set()
+
+intake_latency = LatencyHistogram()
+intake_stats = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+
+def intake_has_capacity() -> bool:
+    """Cheap check before accepting an upload, a full queue counts as a rejection"""
+    if intake_queue is not None and intake_queue.full():
+        intake_stats["rejected"] += 1
+        return False
+    return True
+
+
+def enqueue_intake(interview_id: str) -> bool:
+    """Queue question generation for a stored application, False when the queue is full"""
+    try:
+        intake_queue.put_nowait((interview_id, time.perf_counter()))
+    except asyncio.QueueFull:
+        intake_stats["rejected"] += 1
+        return False
+    done_events.setdefault(interview_id, asyncio.Event())
+    intake_stats["accepted"] += 1
+    return True
+
+
+def prep_cache_key(resume_text: str, jd) -> str:
+    # get_jd_by_id returns the whole JD document, only its text matters for the questions
+    jd_text = jd.get("jd_text", "") if isinstance(jd, dict) else jd
+    return questions_key(content_hash(resume_text), content_hash(jd_text), PREP_PROMPT_VERSION)
+
+
+async def cached_interview_questions(resume_text: str, jd) -> Optional[List[str]]:
+    """Questions generated earlier for the same resume, JD and prep prompt"""
+    return await intake_cache.get(prep_cache_key(resume_text, jd))
+
+
+def start_presynthesis(interview_id: str, questions: List[str]):
+    task = asyncio.create_task(presynthesize_questions(interview_id, questions))
+    background.add(task)
+    task.add_done_callback(background.discard)
+
+
+def stale_before() -> datetime.datetime:
+    return datetime.datetime.utcnow() - datetime.timedelta(seconds=INTAKE_STALE_AFTER)
+
+
+async def process_intake(interview_id: str):
+    interview_data = await claim_intake_job(interview_id, stale_before())
+    if not interview_data:
+        # Already taken by another worker or process
+        return
+
+    try:
+        jd_text = await get_jd_by_id(interview_data["jd_id"])
+        if not jd_text:
+            raise ValueError("Job description not found.")
+        questions = await cached_interview_questions(interview_data["resume_text"], jd_text)
+        if questions is None:
+            llm_result = await call_llm_for_interview_prep(interview_data["resume_text"], jd_text)
+            questions = llm_result.get("interview_questions") or []
+            if not questions:
+                raise ValueError("No interview questions were generated.")
+            await intake_cache.put(prep_cache_key(interview_data["resume_text"], jd_text), questions)
+    except asyncio.CancelledError:
+        # Shutting down, hand the job back so the next start picks it up instead of it staying in processing
+        await release_intake_job(interview_id)
+        raise
+    except Exception as e:
+        print(f"Error preparing interview {interview_id}: {e}")
+        intake_stats["failed"] += 1
+        await complete_intake_job(interview_id, [], INTAKE_FAILED, str(e))
+        return
+
+    result = await complete_intake_job(interview_id, questions, "interview_scheduled")
+    if "error" in result:
+        print(f"Error storing interview questions: {result['error']}")
+        intake_stats["failed"] += 1
+        return
+
+    intake_stats["completed"] += 1
+    start_presynthesis(interview_id, questions)
+
+
+async def intake_worker():
+    while True:
+        interview_id, queued_at = await intake_queue.get()
+        try:
+            await process_intake(interview_id)
+        except Exception as e:
+            print(f"Error in intake worker for {interview_id}: {e}")
+        finally:
+            intake_latency.observe(time.perf_counter() - queued_at)
+            event = done_events.pop(interview_id, None)
+            if event:
+                event.set()
+            intake_queue.task_done()
+
+
+async def requeue_pending_intakes():
+    """
+    Queue applications accepted before a restart and jobs abandoned in processing, then check again every
+    INTAKE_STALE_AFTER seconds. Waits for queue space instead of dropping jobs, claiming makes this safe
+    with several server processes.
+    """
+    while True:
+        try:
+            for interview_id in await get_pending_intake_ids(stale_before()):
+                if interview_id in done_events:
+                    # Already queued in this process
+                    continue
+                done_events[interview_id] = asyncio.Event()
+                await intake_queue.put((interview_id, time.perf_counter()))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error requeueing pending applications: {e}")
+        await asyncio.sleep(INTAKE_STALE_AFTER)
+
+
+async def start_intake_workers():
+    global intake_queue, requeue_task
+    if intake_queue is not None:
+        return
+    intake_queue = asyncio.Queue(maxsize=INTAKE_MAX_PENDING)
+    workers.extend(asyncio.create_task(intake_worker()) for _ in range(INTAKE_WORKERS))
+    requeue_task = asyncio.create_task(requeue_pending_intakes())
+
+
+async def stop_intake_workers():
+    global intake_queue, requeue_task
+    tasks = workers + ([requeue_task] if requeue_task else [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    workers.clear()
+    # Jobs still queued here are picked up again from the database on the next start
+    done_events.clear()
+    requeue_task = None
+    intake_queue = None
+
+
+async def wait_for_intake(interview_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+    """Interview data once questions are ready (or intake failed), None if still pending after timeout"""
+    deadline = time.monotonic() + timeout
+    while True:
+        intake = await get_intake_status(interview_id)
+        if not intake or intake.get("status") not in INTAKE_STATUSES:
+            return await get_interview_data_by_id(interview_id) if intake else None
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        event = done_events.get(interview_id)
+        try:
+            if event:
+                await asyncio.wait_for(event.wait(), min(remaining, INTAKE_POLL_INTERVAL * 10))
+            else:
+                await asyncio.sleep(min(remaining, INTAKE_POLL_INTERVAL))
+        except TimeoutError:
+            pass
+
+
+def get_intake_stats():
+    return {
+        **intake_stats,
+        "queued": intake_queue.qsize() if intake_queue else 0,
+        "max_pending": INTAKE_MAX_PENDING,
+        "workers": len(workers),
+        "latency": intake_latency.snapshot(),
+        "cache": intake_cache.snapshot(),
+    }
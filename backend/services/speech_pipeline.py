@@ -0,0 +1,64 @@
+import asyncio
+import re
+from typing import AsyncIterator, Awaitable, Callable, List
+from .tts_services import text_to_speech_sarvam_base64_array
+
+# Very short sentences ("Great.") are joined with the next one instead of becoming their own TTS call
+MIN_SENTENCE_CHARS = 25
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+async def stream_sentences(deltas: AsyncIterator[str], min_chars: int = MIN_SENTENCE_CHARS) -> AsyncIterator[str]:
+    """Group streamed LLM text into sentences, yielding each one as soon as it is complete"""
+    buffer = ""
+    pending = ""
+    async for delta in deltas:
+        buffer += delta
+        parts = SENTENCE_BOUNDARY.split(buffer)
+        # The last part may still be growing
+        buffer = parts.pop()
+        for part in parts:
+            pending = f"{pending} {part}".strip()
+            if len(pending) >= min_chars:
+                yield pending
+                pending = ""
+
+    tail = f"{pending} {buffer}".strip()
+    if tail:
+        yield tail
+
+
+async def synthesize_sentences(sentences: AsyncIterator[str], on_sentence: Callable[[int, str, List[str]], Awaitable[None]]):
+    """
+    Start TTS for every sentence the moment it is complete, so synthesis overlaps with the rest of
+    the LLM stream, and hand (index, sentence, audios) to on_sentence in sentence order.
+    """
+    queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for sentence in sentences:
+                queue.put_nowait((sentence, asyncio.create_task(text_to_speech_sarvam_base64_array(sentence))))
+        finally:
+            queue.put_nowait(None)
+
+    async def consume():
+        index = 0
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            sentence, task = item
+            await on_sentence(index, sentence, await task)
+            index += 1
+
+    producer = asyncio.create_task(produce())
+    try:
+        await consume()
+        await producer
+    finally:
+        producer.cancel()
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                item[1].cancel()
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# In-memory LRU in front of an on-disk tier, both bounded by size. TTS_CACHE_DIR="" disables the disk tier.
+TTS_CACHE_MEMORY_MB = float(os.getenv("TTS_CACHE_MEMORY_MB", "64"))
+TTS_CACHE_DISK_MB = float(os.getenv("TTS_CACHE_DISK_MB", "1024"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tts_cache"))
+
+
+def tts_cache_key(text, language, sample_rate, backend):
+    # The backend is part of the key so silent audio from TTS_BACKEND=mock is never served by the real one
+    return hashlib.sha256(f"{backend}\0{language}\0{sample_rate}\0{text}".encode("utf-8")).hexdigest()
+
+
+def audios_size(audios):
+    return sum(len(a) for a in audios)
+
+
+class DiskTier:
+    """One JSON file per entry, least recently used files are deleted once the directory is over its size cap"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".json"))
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path) as f:
+                audios = json.load(f)
+            # Reads refresh the mtime that eviction orders by
+            os.utime(path)
+            return audios
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, audios):
+        path = self.path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(audios, f)
+        with self.lock:
+            if os.path.exists(path):
+                self.size -= os.path.getsize(path)
+            os.replace(tmp_path, path)
+            self.size += os.path.getsize(path)
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries:
+            if self.size <= self.max_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self.size -= size
+            except FileNotFoundError:
+                pass
+
+
+class TTSCache:
+    def __init__(self, memory_mb=TTS_CACHE_MEMORY_MB, disk_dir=TTS_CACHE_DIR, disk_mb=TTS_CACHE_DISK_MB):
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.max_memory_bytes = int(memory_mb * 1024 * 1024)
+        self.disk = None
+        if disk_dir:
+            try:
+                self.disk = DiskTier(disk_dir, int(disk_mb * 1024 * 1024))
+            except OSError as e:
+                print(f"TTS disk cache disabled, cannot use {disk_dir}: {e}")
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def put_memory(self, key, audios):
+        if key in self.memory:
+            self.memory_bytes -= audios_size(self.memory.pop(key))
+        self.memory[key] = audios
+        self.memory_bytes += audios_size(audios)
+        while self.memory_bytes > self.max_memory_bytes and self.memory:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= audios_size(evicted)
+            self.stats["evictions"] += 1
+
+    async def get(self, key):
+        audios = self.memory.get(key)
+        if audios is not None:
+            self.memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return audios
+
+        if self.disk:
+            audios = await asyncio.to_thread(self.disk.get, key)
+            if audios is not None:
+                self.stats["disk_hits"] += 1
+                self.put_memory(key, audios)
+                return audios
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, key, audios):
+        self.put_memory(key, audios)
+        if self.disk:
+            try:
+                await asyncio.to_thread(self.disk.put, key, audios)
+            except OSError as e:
+                print(f"Error writing TTS cache entry: {e}")
+
+    def snapshot(self):
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory_bytes,
+            "disk_bytes": self.disk.size if self.disk else 0,
+        }
+
+
+tts_cache = TTSCache()
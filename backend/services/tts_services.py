@@ -1,31 +1,189 @@
+import asyncio
+import base64
+import io
 import os
-from sarvamai import SarvamAI
+import random
+import time
+import wave
 from dotenv import load_dotenv
 import httpx
+from .latency import LatencyHistogram
+from .tts_cache import tts_cache, tts_cache_key
+from .mongo_op import save_question_audio
 
 load_dotenv()
-sarvam_client = SarvamAI(api_subscription_key=os.getenv('SARVAMAI_API_KEY'))
+
+SARVAM_TTS_URL = "https://api.sarvam.ai/text-to-speech"
+TTS_LANGUAGE = "en-IN"
+TTS_SAMPLE_RATE = 16000
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", "15"))
+TTS_MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "2"))
+TTS_MAX_CONNECTIONS = int(os.getenv("TTS_MAX_CONNECTIONS", "20"))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# sarvam (default) or mock (silent WAV sized like real speech after a fixed delay, no network)
+TTS_BACKEND = os.getenv("TTS_BACKEND", "sarvam")
+TTS_MOCK_LATENCY_MS = float(os.getenv("TTS_MOCK_LATENCY_MS", "400"))
+
+# One keep-alive HTTP/2 client per worker, opened and closed in the app lifespan
+http_client = None
+
+tts_latency = LatencyHistogram()
+tts_request_latency = LatencyHistogram()
+tts_stats = {"calls": 0, "retries": 0, "errors": 0}
+
+
+def start_tts_client():
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            http2=True,
+            headers={"api-subscription-key": os.getenv('SARVAMAI_API_KEY') or ""},
+            limits=httpx.Limits(max_connections=TTS_MAX_CONNECTIONS, max_keepalive_connections=TTS_MAX_CONNECTIONS, keepalive_expiry=60),
+            timeout=httpx.Timeout(TTS_TIMEOUT, connect=5.0),
+        )
+
+
+async def close_tts_client():
+    global http_client
+    if http_client:
+        await http_client.aclose()
+        http_client = None
+
+
+async def post_with_retries(payload):
+    for attempt in range(TTS_MAX_RETRIES + 1):
+        request_start = time.perf_counter()
+        try:
+            response = await http_client.post(SARVAM_TTS_URL, json=payload)
+            tts_request_latency.observe(time.perf_counter() - request_start)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == TTS_MAX_RETRIES:
+                return response
+        except httpx.TransportError:
+            tts_request_latency.observe(time.perf_counter() - request_start)
+            if attempt == TTS_MAX_RETRIES:
+                raise
+
+        tts_stats["retries"] += 1
+        # Exponential backoff with jitter
+        await asyncio.sleep(0.25 * 2 ** attempt + random.uniform(0, 0.1))
+
+
+# Synthesis already in progress per cache key, so concurrent requests for the same text share one call
+in_flight = {}
+
+
+def audio_cache_key(text):
+    return tts_cache_key(text, TTS_LANGUAGE, TTS_SAMPLE_RATE, TTS_BACKEND)
 
 
 async def text_to_speech_sarvam_base64_array(text):
     """
-    Convert text to speech using Sarvam API and return base64 audio array
+    Convert text to speech using Sarvam API and return base64 audio array.
+    Results are cached by (text, language, sample rate, backend), repeated prompts skip the API call.
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.sarvam.ai/text-to-speech",
-            headers={
-                "api-subscription-key": os.getenv('SARVAMAI_API_KEY')
-            },
-            json={
-                "text": text,
-                "target_language_code": "en-IN",
-                "speech_sample_rate": 16000,
-                "enable_preprocessing": True
-            },
-        )
-    
-    response.raise_for_status()
+    key = audio_cache_key(text)
+    audios = await tts_cache.get(key)
+    if audios is not None:
+        return audios
+
+    if key in in_flight:
+        return await asyncio.shield(in_flight[key])
+
+    task = asyncio.create_task(synthesize_and_cache(key, text))
+    in_flight[key] = task
+    task.add_done_callback(lambda _: in_flight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def synthesize_and_cache(key, text):
+    # Cached by the task itself, so the audio is kept even when every caller was cancelled (e.g. a dropped prefetch)
+    audios = await synthesize(text)
+    if audios:
+        await tts_cache.put(key, audios)
+    return audios
+
+
+def silent_wav_base64(seconds):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(TTS_SAMPLE_RATE)
+        wav.writeframes(b"\0\0" * int(seconds * TTS_SAMPLE_RATE))
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+async def mock_synthesize(text):
+    await asyncio.sleep(TTS_MOCK_LATENCY_MS / 1000)
+    # Roughly 2.5 spoken words per second
+    return [silent_wav_base64(len(text.split()) / 2.5)]
+
+
+async def synthesize(text):
+    if TTS_BACKEND == "mock":
+        tts_stats["calls"] += 1
+        return await mock_synthesize(text)
+
+    if http_client is None:
+        start_tts_client()
+
+    tts_stats["calls"] += 1
+    start = time.perf_counter()
+    try:
+        response = await post_with_retries({
+            "text": text,
+            "target_language_code": TTS_LANGUAGE,
+            "speech_sample_rate": TTS_SAMPLE_RATE,
+            "enable_preprocessing": True
+        })
+        response.raise_for_status()
+    except Exception:
+        tts_stats["errors"] += 1
+        raise
+    finally:
+        tts_latency.observe(time.perf_counter() - start)
+
     response_data = response.json()
-    
+
     return response_data.get("audios", [])
+
+
+async def presynthesize_questions(interview_id, questions):
+    """
+    Background task run when an interview is scheduled: synthesize every fixed question into the TTS cache
+    and record its cache key with the interview, so the opener can be sent as soon as the candidate connects.
+    Only the key is stored, inline audio would make every read of the interview document megabytes larger.
+    """
+    results = await asyncio.gather(*[text_to_speech_sarvam_base64_array(q) for q in questions], return_exceptions=True)
+
+    question_audio = []
+    for question, audios in zip(questions, results):
+        if isinstance(audios, BaseException):
+            print(f"Error pre-synthesizing question for interview {interview_id}: {audios}")
+            continue
+        question_audio.append({"text": question, "cache_key": audio_cache_key(question)})
+
+    if question_audio:
+        result = await save_question_audio(interview_id, question_audio)
+        if "error" in result:
+            print(f"Error storing pre-synthesized audio: {result['error']}")
+
+
+async def find_question_audio(interview_data, text):
+    """Pre-synthesized audio of this exact question text, None if it was not prepared or left the cache"""
+    for entry in interview_data.get("question_audio") or []:
+        if entry.get("text") == text:
+            if entry.get("cache_key"):
+                return await tts_cache.get(entry["cache_key"])
+            # Interviews scheduled before only the cache key was stored have the audio inline
+            return entry.get("audios")
+    return None
+
+
+def get_tts_stats():
+    return {
+        **tts_stats,
+        "cache": tts_cache.snapshot(),
+        "latency": tts_latency.snapshot(),
+        "request_latency": tts_request_latency.snapshot(),
+    }
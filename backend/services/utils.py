@@ -1,24 +1,38 @@
-import base64
-from typing import IO
+import io
+import itertools
+import signal
+import threading
+from typing import IO, Iterator, Optional, Tuple
 import PyPDF2
 
 
-def pdf_to_base64(pdf_file: IO[bytes]) -> str:
-    pdf_bytes = pdf_file.read()
-    return base64.b64encode(pdf_bytes).decode('utf-8')
+def iter_pdf_page_text(pdf_stream: IO[bytes], max_pages: Optional[int] = None) -> Iterator[str]:
+    """Text of each page in order, stopping after max_pages"""
+    reader = PyPDF2.PdfReader(pdf_stream)
+    for page in itertools.islice(reader.pages, max_pages):
+        yield page.extract_text() or ""
 
 
-def base64_to_pdf_bytes(base64_string: str) -> bytes:
-    return base64.b64decode(base64_string)
+def extract_text_from_pdf_bytes(pdf_bytes: bytes, max_pages: Optional[int] = None, timeout: Optional[float] = None) -> Tuple[str, int]:
+    """
+    Process-pool entry point: (text, pages read). The timeout is enforced with a timer signal inside
+    the worker, so a pathological document is abandoned instead of keeping the worker busy.
+    """
+    pages = []
 
+    def abandon(signum, frame):
+        raise TimeoutError(f"PDF extraction took longer than {timeout}s")
 
-def extract_text_from_pdf_stream(pdf_stream: IO[bytes]) -> str:
-    text = ""
+    # Signals only reach the main thread, which is where process pool workers run jobs
+    use_timer = timeout and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if use_timer:
+        previous = signal.signal(signal.SIGALRM, abandon)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
     try:
-        reader = PyPDF2.PdfReader(pdf_stream)
-        for page_num in range(len(reader.pages)):
-            page = reader.pages[page_num]
-            text += page.extract_text() or ""
-    except Exception as e:
-        print(f"Error extracting text from PDF stream: {e}")
-    return text
\ No newline at end of file
+        for page_text in iter_pdf_page_text(io.BytesIO(pdf_bytes), max_pages):
+            pages.append(page_text)
+    finally:
+        if use_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return "\n".join(pages), len(pages)
@@ -0,0 +1,104 @@
+"""
+Accuracy and speed benchmark for detect-then-track face detection in OpenCVAntiCheat.
+
+Replays recorded frames (a video file or a directory of images) through a baseline detector
+(full-frame cascade on every frame) and through the tracking pipeline, then reports the
+throughput of each and how often the tracking pipeline agrees with the baseline.
+
+Several recordings can be given and are reported separately. --two-faces also replays every recording
+as a two-person one (each frame next to its mirror image), so the multiple_faces count can be compared.
+
+Run from the backend directory:
+    python -m tools.bench_face_tracking recordings/session.webm --interval 5 --pyramid-levels 1
+    python -m tools.bench_face_tracking recordings/session.webm recordings/two_people.webm --two-faces
+"""
+import argparse
+import os
+import time
+import cv2
+from services.camera import OpenCVAntiCheat
+
+
+def load_frames(path, max_frames):
+    frames = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            frame = cv2.imread(os.path.join(path, name), cv2.IMREAD_COLOR)
+            if frame is not None:
+                frames.append(frame)
+            if len(frames) >= max_frames:
+                break
+        return frames
+
+    capture = cv2.VideoCapture(path)
+    while len(frames) < max_frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def two_face_frames(frames):
+    """Each frame next to its mirror image, so every face in the recording appears twice"""
+    return [cv2.hconcat([frame, cv2.flip(frame, 1)]) for frame in frames]
+
+
+def run(detector, frames):
+    results = []
+    start = time.perf_counter()
+    for frame in frames:
+        _, metrics = detector.process_frame(frame.copy(), draw=False)
+        results.append(metrics)
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def compare(name, frames, args):
+    baseline, baseline_time = run(OpenCVAntiCheat(detect_interval=1, pyramid_levels=0), frames)
+    tracked, tracked_time = run(OpenCVAntiCheat(detect_interval=args.interval, pyramid_levels=args.pyramid_levels), frames)
+
+    n = len(frames)
+    same_detection = sum(b['face_detected'] == t['face_detected'] for b, t in zip(baseline, tracked))
+    same_violations = sum(set(b['current_violations']) == set(t['current_violations']) for b, t in zip(baseline, tracked))
+    both_faces = [(b, t) for b, t in zip(baseline, tracked) if b['face_size_ratio'] and t['face_size_ratio']]
+    ratio_error = sum(abs(b['face_size_ratio'] - t['face_size_ratio']) for b, t in both_faces) / max(1, len(both_faces))
+
+    print(f"== {name}")
+    print(f"Frames: {n} ({frames[0].shape[1]}x{frames[0].shape[0]})")
+    print(f"Baseline:  {n / baseline_time:8.1f} fps")
+    print(f"Tracking:  {n / tracked_time:8.1f} fps  (interval={args.interval}, pyramid_levels={args.pyramid_levels})")
+    print(f"Speedup:   {baseline_time / tracked_time:8.2f}x")
+    print(f"Face detected agreement:  {same_detection / n:.1%}")
+    print(f"Violation set agreement:  {same_violations / n:.1%}")
+    print(f"Mean face size ratio error: {ratio_error:.4f}")
+    print(f"Violation totals baseline: {baseline[-1]['violations_breakdown']}")
+    print(f"Violation totals tracking: {tracked[-1]['violations_breakdown']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Video files or directories of frame images")
+    parser.add_argument("--interval", type=int, default=5, help="Full detection every N frames")
+    parser.add_argument("--pyramid-levels", type=int, default=1, help="pyrDown levels for full detection")
+    parser.add_argument("--max-frames", type=int, default=1000)
+    parser.add_argument("--two-faces", action="store_true", help="also replay each recording with two faces per frame")
+    args = parser.parse_args()
+
+    # Single threaded OpenCV so both runs measure the same thing the frame workers do
+    cv2.setNumThreads(1)
+
+    for path in args.paths:
+        frames = load_frames(path, args.max_frames)
+        if not frames:
+            raise SystemExit(f"No frames could be read from {path}")
+        compare(path, frames, args)
+        if args.two_faces:
+            print()
+            compare(f"{path} (two faces)", two_face_frames(frames), args)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Throughput and latency benchmark for resume PDF text extraction.
+
+Extracts every PDF of a corpus directory (or a generated corpus of resumes with 1 to --max-synthetic-pages
+pages) inline in this process, then through the process pool used by the API with all documents in flight.
+Reports pages/sec and per-document p50/p95/p99 extraction time for both.
+
+Run from the backend directory:
+    python -m tools.bench_pdf_extraction resumes/ --workers 4 --max-pages 20
+    python -m tools.bench_pdf_extraction --synthetic 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from services import pdf_executor
+from services.utils import extract_text_from_pdf_bytes
+from tools.common import text_pdf, percentiles
+
+LOREM = (
+    "Designed and shipped backend services in Python handling millions of requests per day. "
+    "Led the migration of a monolith to event driven services and mentored three engineers. "
+    "Improved p99 latency by forty percent through profiling, caching and query tuning."
+).split()
+
+
+def synthetic_pdf(pages, lines_per_page=45, seed=0):
+    """Text-only PDF with the given number of pages of resume-like text"""
+    rng = random.Random(seed)
+    return text_pdf([[" ".join(rng.choices(LOREM, k=12)) for _ in range(lines_per_page)] for _ in range(pages)])
+
+
+def load_corpus(args):
+    if args.corpus:
+        names = sorted(name for name in os.listdir(args.corpus) if name.lower().endswith(".pdf"))
+        corpus = []
+        for name in names:
+            with open(os.path.join(args.corpus, name), "rb") as f:
+                corpus.append(f.read())
+        return corpus
+    rng = random.Random(42)
+    return [synthetic_pdf(rng.randint(1, args.max_synthetic_pages), seed=i) for i in range(args.synthetic)]
+
+
+def summarize(durations, pages, elapsed):
+    stats = percentiles(durations)
+    return {
+        "documents": stats.pop("count"),
+        "pages": pages,
+        "elapsed_s": round(elapsed, 2),
+        "pages_per_s": round(pages / elapsed, 1) if elapsed else 0.0,
+        **stats,
+    }
+
+
+def run_inline(corpus, args):
+    durations = []
+    pages = 0
+    start = time.perf_counter()
+    for pdf in corpus:
+        doc_start = time.perf_counter()
+        _, doc_pages = extract_text_from_pdf_bytes(pdf, args.max_pages)
+        durations.append(time.perf_counter() - doc_start)
+        pages += doc_pages
+    return summarize(durations, pages, time.perf_counter() - start)
+
+
+async def run_pool(corpus, args):
+    pdf_executor.PDF_WORKERS = args.workers
+    pdf_executor.start_pdf_executor()
+    # Let the worker processes finish starting before timing
+    await pdf_executor.extract_pdf_text(corpus[0], args.max_pages, args.timeout)
+
+    durations = []
+
+    async def timed(pdf):
+        doc_start = time.perf_counter()
+        try:
+            await pdf_executor.extract_pdf_text(pdf, args.max_pages, args.timeout)
+        except pdf_executor.PDFExtractionError as e:
+            print(f"Extraction failed: {e}")
+        # Includes time waiting for a free worker, as an upload would
+        durations.append(time.perf_counter() - doc_start)
+
+    pages_before = pdf_executor.pdf_stats["pages"]
+    start = time.perf_counter()
+    await asyncio.gather(*[timed(pdf) for pdf in corpus])
+    elapsed = time.perf_counter() - start
+    pdf_executor.shutdown_pdf_executor()
+    return summarize(durations, pdf_executor.pdf_stats["pages"] - pages_before, elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", help="directory of PDF files")
+    parser.add_argument("--synthetic", type=int, default=100, help="documents to generate when no corpus is given")
+    parser.add_argument("--max-synthetic-pages", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=pdf_executor.PDF_WORKERS)
+    parser.add_argument("--max-pages", type=int, default=pdf_executor.PDF_MAX_PAGES)
+    parser.add_argument("--timeout", type=float, default=pdf_executor.PDF_TIMEOUT)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args)
+    if not corpus:
+        raise SystemExit("No PDF documents to benchmark")
+    print(json.dumps({
+        "inline": run_inline(corpus, args),
+        "pool": asyncio.run(run_pool(corpus, args)),
+        "workers": args.workers,
+    }, indent=2))
@@ -0,0 +1,42 @@
+"""
+Helpers shared by the benchmark and load test tools.
+"""
+import statistics
+
+
+def text_pdf(pages, font_size=10, leading=14):
+    """
+    Minimal PDF with a text layer, one list of lines per page, enough for the server's text extraction.
+    Parentheses in the text are replaced so the content streams need no escaping.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        text = f"BT /F1 {font_size} Tf 50 760 Td {leading} TL " + " ".join(
+            f"({line.replace('(', '[').replace(')', ']')}) '" for line in lines
+        ) + " ET"
+        objects.append(f"<< /Length {len(text)} >>\nstream\n{text}\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {content_ref} 0 R /Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref_at = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n"
+    return pdf.encode("latin-1")
+
+
+def percentiles(samples):
+    """Count and p50/p95/p99/max in milliseconds of durations given in seconds"""
+    if not samples:
+        return {}
+    ms = sorted(s * 1000 for s in samples)
+    cuts = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    return {"count": len(ms), "p50_ms": round(cuts[49], 1), "p95_ms": round(cuts[94], 1), "p99_ms": round(cuts[98], 1), "max_ms": round(ms[-1], 1)}
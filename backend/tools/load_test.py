@@ -0,0 +1,196 @@
+"""
+Load test: drives simulated interviews end to end through a running API server.
+
+Each simulated candidate applies with a generated resume PDF (POST /resumes/apply/), connects to
+/ws/interview/{id}/ and answers every question with dummy audio until the interview is closed.
+Reports how long the application upload takes, the time from connecting to the first question
+(which includes waiting for the queued question generation) and per-turn latency percentiles.
+
+Start the server with the offline stand-ins so no external API is called (MongoDB is still needed):
+    LLM_BACKEND=mock ASR_BACKEND=replay TTS_BACKEND=mock uvicorn app:app --port 8000
+
+LLM_MOCK_LATENCY_MS, ASR_REPLAY_LATENCY_MS and TTS_MOCK_LATENCY_MS set the simulated latencies,
+LLM_BACKEND=replay serves responses recorded earlier with LLM_BACKEND=record instead.
+
+Run from the backend directory:
+    python -m tools.load_test --url http://localhost:8000 --interviews 1000 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import httpx
+import websockets
+from tools.common import text_pdf, percentiles
+
+RESUME_TEXT = [
+    "Alex Candidate - Backend Engineer",
+    "alex.candidate@example.com",
+    "Four years building Python services with FastAPI and MongoDB.",
+    "Cut p99 latency of a payments API by half with caching and background workers.",
+]
+
+JD_TEXT = "Backend engineer to build and scale Python APIs for an interview platform."
+
+
+class Results:
+    def __init__(self):
+        self.apply = []
+        self.first_question = []
+        self.turn_first_byte = []
+        self.turn_complete = []
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.errors = {}
+
+    def fail(self, error):
+        self.failed += 1
+        key = type(error).__name__ if isinstance(error, Exception) else str(error)
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+
+def is_question_complete(message, protocol):
+    """True for the message that ends one interviewer question in either protocol version"""
+    if isinstance(message, bytes):
+        # v2 audio frame header: version, frame type, part index, segment index, segment count
+        return message[1] == 1 and int.from_bytes(message[4:6], "big") + 1 == int.from_bytes(message[6:8], "big")
+    return message.startswith("AI_QUESTION_END:") or (protocol == 1 and message.startswith("AI_AUDIO_ARRAY:"))
+
+
+def is_closing(question, interview_id):
+    """The closing message is the only one the server puts the interview ID in"""
+    return f"Interview ID: {interview_id}" in question
+
+
+async def receive_question(ws, protocol):
+    """
+    Wait for one full question, returns its text and the seconds until its first message and until it
+    was complete
+    """
+    start = time.perf_counter()
+    first = None
+    text = ""
+    while True:
+        message = await ws.recv()
+        if isinstance(message, str):
+            if message.startswith("ERROR:"):
+                raise RuntimeError(message)
+            for prefix in ("AI_QUESTION_TEXT:", "AI_QUESTION_END:"):
+                if message.startswith(prefix):
+                    text = message[len(prefix):]
+        if first is None and (isinstance(message, bytes) or message.startswith(("AI_QUESTION_TEXT:", "AI_QUESTION_PART:"))):
+            first = time.perf_counter() - start
+        if is_question_complete(message, protocol):
+            return text, first or 0.0, time.perf_counter() - start
+
+
+async def run_interview(client, args, jd_id, pdf, answer, results, candidate):
+    # Resumes and interviews are upserted by candidate name and email, so every simulated candidate needs its own
+    name, email = f"Load Test {candidate}", f"load.test.{candidate}@example.com"
+    start = time.perf_counter()
+    while True:
+        response = await client.post(
+            "/resumes/apply/",
+            data={"candidate_name": name, "candidate_email": email, "jd_id": jd_id},
+            files={"resume_file": ("resume.pdf", pdf, "application/pdf")},
+        )
+        if response.status_code != 503:
+            break
+        # Intake queue full, back off as the server asks
+        results.rejected += 1
+        await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+    response.raise_for_status()
+    results.apply.append(time.perf_counter() - start)
+    interview_id = response.json()["interview_id"]
+
+    ws_url = args.url.replace("http", "ws", 1) + f"/ws/interview/{interview_id}/?protocol={args.protocol}&stream={int(args.stream)}"
+    connected_at = time.perf_counter()
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        question, _, _ = await receive_question(ws, args.protocol)
+        results.first_question.append(time.perf_counter() - connected_at)
+        while not is_closing(question, interview_id):
+            try:
+                # The candidate speaking
+                await asyncio.sleep(args.think_time)
+                await ws.send(answer)
+                question, first, complete = await receive_question(ws, args.protocol)
+            except websockets.ConnectionClosedOK:
+                break
+            if is_closing(question, interview_id):
+                # Not a turn: the closing message is fixed text sent after the report is requested
+                break
+            results.turn_first_byte.append(first)
+            results.turn_complete.append(complete)
+        # The server closes the socket once the report is stored, closing first would interrupt it
+        await ws.wait_closed()
+    results.completed += 1
+
+
+async def main(args):
+    results = Results()
+    pdf = text_pdf([RESUME_TEXT], font_size=12, leading=16)
+    answer = os.urandom(args.answer_bytes)
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        response = await client.post("/jd/", json={"domain": "load-test", "jd_text": JD_TEXT})
+        response.raise_for_status()
+        jd_id = response.json()["id"]
+
+        slots = asyncio.Semaphore(args.concurrency)
+
+        # Unique per run too, so a rerun against the same database does not reuse earlier interviews
+        run_id = os.urandom(4).hex()
+
+        async def simulated_candidate(number):
+            async with slots:
+                try:
+                    await asyncio.wait_for(run_interview(client, args, jd_id, pdf, answer, results, f"{run_id}-{number}"), args.timeout)
+                except Exception as e:
+                    results.fail(e)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[simulated_candidate(number) for number in range(args.interviews)])
+        elapsed = time.perf_counter() - start
+
+        server_stats = {}
+        for area in ("intake", "llm", "tts", "prefetch"):
+            try:
+                server_stats[area] = (await client.get(f"/stats/{area}")).json()
+            except Exception:
+                pass
+
+    report = {
+        "interviews": args.interviews,
+        "concurrency": args.concurrency,
+        "completed": results.completed,
+        "failed": results.failed,
+        "apply_rejected": results.rejected,
+        "errors": results.errors,
+        "elapsed_s": round(elapsed, 1),
+        "interviews_per_s": round(results.completed / elapsed, 2) if elapsed else 0.0,
+        "apply": percentiles(results.apply),
+        "first_question": percentiles(results.first_question),
+        "turn_first_message": percentiles(results.turn_first_byte),
+        "turn_complete": percentiles(results.turn_complete),
+    }
+    if args.server_stats:
+        report["server"] = server_stats
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--interviews", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--protocol", type=int, choices=(1, 2), default=1)
+    parser.add_argument("--stream", action="store_true", help="stream follow-up questions sentence by sentence")
+    parser.add_argument("--think-time", type=float, default=1.0, help="seconds each simulated answer takes")
+    parser.add_argument("--answer-bytes", type=int, default=32000)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--server-stats", action="store_true", help="include the server's /stats endpoints in the report")
+    main_args = parser.parse_args()
+    asyncio.run(main(main_args))
@@ -0,0 +1,33 @@
+"""
+Move resume PDFs stored inline as base64 (resume_base64 in uploaded_resume) into GridFS.
+
+Documents are migrated one at a time, so the script can be stopped and re-run safely.
+Until a document is migrated its PDF is still served from the base64 copy.
+
+Run from the backend directory:
+    python -m tools.migrate_resumes_to_gridfs --limit 1000
+"""
+import argparse
+import asyncio
+from services import mongo_op
+
+
+async def main(args):
+    await mongo_op.connect_to_mongo()
+    migrated = failed = 0
+    try:
+        async for resume in mongo_op.find_legacy_resumes().limit(args.limit):
+            result = await mongo_op.migrate_resume_to_gridfs(resume)
+            if "error" in result:
+                failed += 1
+            else:
+                migrated += 1
+    finally:
+        await mongo_op.close_mongo_connection()
+    print(f"Migrated {migrated} resumes to GridFS, {failed} failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=0, help="maximum documents to migrate, 0 for all")
+    asyncio.run(main(parser.parse_args()))
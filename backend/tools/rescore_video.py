@@ -0,0 +1,165 @@
+"""
+Offline proctoring re-scoring and threshold tuning over a recorded interview video.
+
+The video is streamed in chunks and face detection runs once per frame, using the same
+OpenCVAntiCheat pipeline as the /ws endpoint. The per-frame face boxes are cached (--cache),
+then every threshold configuration in the grid is scored in one vectorized NumPy pass,
+so adding configurations never re-runs detection.
+
+Run from the backend directory:
+    python -m tools.rescore_video recordings/interview.webm --cache interview.npz \\
+        --movement 30,50,80 --h-dev 0.15,0.2,0.25 --v-dev 0.15 --min-ratio 0.02 --max-ratio 0.35 \\
+        --output scores.csv
+"""
+import argparse
+import csv
+import itertools
+import os
+import cv2
+import numpy as np
+from services.camera import OpenCVAntiCheat
+
+THRESHOLD_NAMES = ["movement_threshold", "max_horizontal_deviation", "max_vertical_deviation", "min_face_ratio", "max_face_ratio"]
+VIOLATION_NAMES = ["no_face", "multiple_faces", "looking_away", "too_close", "too_far", "excessive_movement"]
+
+
+def read_chunks(path, chunk_size):
+    capture = cv2.VideoCapture(path)
+    try:
+        while True:
+            chunk = []
+            while len(chunk) < chunk_size:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                chunk.append(frame)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        capture.release()
+
+
+def detect_boxes(path, chunk_size, detect_interval, pyramid_levels):
+    """Run face detection once per frame. Returns the per-frame arrays that scoring needs."""
+    detector = OpenCVAntiCheat(detect_interval=detect_interval, pyramid_levels=pyramid_levels)
+    boxes, face_counts, profiles = [], [], []
+    frame_size = None
+
+    for chunk in read_chunks(path, chunk_size):
+        for frame in chunk:
+            frame_size = frame.shape[:2]
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces, profile_detected = detector.locate_faces(gray)
+
+            face_counts.append(len(faces))
+            profiles.append(profile_detected)
+            if len(faces) > 0:
+                boxes.append(max(faces, key=lambda f: f[2] * f[3]))
+            else:
+                boxes.append((np.nan, np.nan, np.nan, np.nan))
+        print(f"Detected faces in {len(face_counts)} frames...")
+
+    return {
+        "boxes": np.asarray(boxes, dtype=np.float64).reshape(-1, 4),
+        "face_counts": np.asarray(face_counts, dtype=np.int32),
+        "profiles": np.asarray(profiles, dtype=bool),
+        "frame_size": np.asarray(frame_size or (0, 0), dtype=np.int32),
+    }
+
+
+def score_configs(cache, configs):
+    """
+    Score every threshold configuration at once.
+    configs has one row per configuration and one column per THRESHOLD_NAMES entry.
+    Returns a (configs, violations) count matrix in VIOLATION_NAMES order.
+    """
+    boxes, face_counts, profiles = cache["boxes"], cache["face_counts"], cache["profiles"]
+    frame_h, frame_w = (int(v) for v in cache["frame_size"])
+    has_face = face_counts > 0
+
+    # Same integer geometry as OpenCVAntiCheat.analyze_face_position / analyze_face_size
+    x, y, w, h = (np.nan_to_num(boxes[:, i]).astype(np.int64) for i in range(4))
+    center_x, center_y = x + w // 2, y + h // 2
+    h_dev = np.abs(center_x - frame_w // 2) / frame_w
+    v_dev = np.abs(center_y - frame_h // 2) / frame_h
+    face_ratio = (w * h) / (frame_h * frame_w)
+
+    # Movement is measured against the last frame that had a face
+    face_index = np.where(has_face, np.arange(len(has_face)), -1)
+    last_face = np.maximum.accumulate(face_index)
+    prev_face = np.concatenate(([-1], last_face[:-1]))
+    has_prev = has_face & (prev_face >= 0)
+    prev = np.clip(prev_face, 0, None)
+    movement = np.sqrt((center_x - center_x[prev]) ** 2 + (center_y - center_y[prev]) ** 2)
+
+    movement_t, max_h, max_v, min_ratio, max_ratio = (configs[:, i:i + 1] for i in range(configs.shape[1]))
+
+    looking_away = (has_face & ((h_dev >= max_h) | (v_dev >= max_v))).sum(axis=1) + (~has_face & profiles).sum()
+    too_far = (has_face & (face_ratio < min_ratio)).sum(axis=1)
+    too_close = (has_face & (face_ratio >= min_ratio) & (face_ratio > max_ratio)).sum(axis=1)
+    excessive_movement = (has_prev & (movement > movement_t)).sum(axis=1)
+
+    n = len(configs)
+    no_face = np.full(n, (~has_face & ~profiles).sum())
+    multiple_faces = np.full(n, (face_counts > 1).sum())
+
+    return np.stack([no_face, multiple_faces, looking_away, too_close, too_far, excessive_movement], axis=1)
+
+
+def parse_values(text):
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+def main():
+    defaults = OpenCVAntiCheat()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Recorded interview video")
+    parser.add_argument("--cache", help="Where to keep the per-frame face boxes (.npz), reused when it exists")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Frames read per chunk")
+    parser.add_argument("--detect-interval", type=int, default=defaults.detect_interval)
+    parser.add_argument("--pyramid-levels", type=int, default=defaults.pyramid_levels)
+    parser.add_argument("--movement", default=str(defaults.movement_threshold))
+    parser.add_argument("--h-dev", default=str(defaults.max_horizontal_deviation))
+    parser.add_argument("--v-dev", default=str(defaults.max_vertical_deviation))
+    parser.add_argument("--min-ratio", default=str(defaults.min_face_ratio))
+    parser.add_argument("--max-ratio", default=str(defaults.max_face_ratio))
+    parser.add_argument("--output", help="Write all configurations and their counts to this CSV")
+    parser.add_argument("--top", type=int, default=10, help="Configurations to print, fewest violations first")
+    args = parser.parse_args()
+
+    if args.cache and os.path.exists(args.cache):
+        cache = dict(np.load(args.cache))
+        print(f"Loaded {len(cache['face_counts'])} cached frames from {args.cache}")
+    else:
+        cache = detect_boxes(args.video, args.chunk_size, args.detect_interval, args.pyramid_levels)
+        if args.cache:
+            np.savez_compressed(args.cache, **cache)
+
+    total_frames = len(cache["face_counts"])
+    if total_frames == 0:
+        raise SystemExit(f"No frames could be read from {args.video}")
+
+    grid = [parse_values(args.movement), parse_values(args.h_dev), parse_values(args.v_dev),
+            parse_values(args.min_ratio), parse_values(args.max_ratio)]
+    configs = np.array(list(itertools.product(*grid)), dtype=np.float64)
+    counts = score_configs(cache, configs)
+    # Same rate as total_violation_rate in the live metrics (excessive movement is not counted there)
+    rates = counts[:, :5].sum(axis=1) / total_frames * 100
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(THRESHOLD_NAMES + VIOLATION_NAMES + ["violation_rate"])
+            for config, row, rate in zip(configs, counts, rates):
+                writer.writerow(list(config) + list(row) + [round(rate, 2)])
+
+    print(f"Scored {len(configs)} configurations over {total_frames} frames")
+    for i in np.argsort(rates, kind="stable")[:args.top]:
+        thresholds = ", ".join(f"{name}={value:g}" for name, value in zip(THRESHOLD_NAMES, configs[i]))
+        violations = ", ".join(f"{name}={int(value)}" for name, value in zip(VIOLATION_NAMES, counts[i]))
+        print(f"{rates[i]:6.2f}%  {thresholds}  |  {violations}")
+
+
+if __name__ == "__main__":
+    main()
@@ -35,7 +35,7 @@ export default function JobsListing() {
         const fetchJobs = async () => {
             try {
                 setLoading(true);
-                const response = await AxiosInstances.get('/jd/all/');
+                const response = await AxiosInstances.get('/jd/all/', { params: { include_text: true } });
 
                 if (response.data && response.data.length > 0) {
                     setJobs(response.data);
@@ -378,7 +378,8 @@ function InterviewContent() {
         try {
             const backendProtocol = window.location.protocol === 'https:' ? 'wss:' : 'wss:';
             const backendHost = 'my-backend-service-873829650882.asia-south1.run.app';
-            const wsUrl = `${backendProtocol}//${backendHost}/ws`;
+            // interview_id links the proctoring telemetry to this interview's report
+            const wsUrl = `${backendProtocol}//${backendHost}/ws${interviewId ? `?interview_id=${encodeURIComponent(interviewId)}` : ''}`;
             cameraWsRef.current = new WebSocket(wsUrl);
 
 